@@ -0,0 +1,69 @@
+"""Memory held by level data: levels.json loaded as nested dicts vs a LevelStore loaded from the same file.
+
+The LevelStore figure is everything the cog keeps: the GuildTable columns, the
+GuildRanking of every guild and the store's own bookkeeping.
+
+Run from the repository root:  python -m benchmarks.bench_memory [users]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+from cogs.leveling.store import LevelStore
+
+USERS = 1_000_000
+
+
+def write_levels(path, n):
+    rng = random.Random(0)
+    users = {
+        str(100000000000000000 + i): {"xp": rng.randrange(0, 500), "level": rng.randrange(0, 50), "prestige": rng.randrange(0, 3)}
+        for i in range(n)
+    }
+    with open(path, "w") as f:
+        json.dump({"1350069822662119496": users}, f)
+
+
+def nested_dict(path):
+    # What the cog held before: {guild_id: {user_id: {"xp": .., "level": .., "prestige": ..}}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def level_store(path):
+    store = LevelStore(path)
+    store._executor.shutdown(wait=True)
+    return store
+
+
+def measure(build, path):
+    tracemalloc.start()
+    data = build(path)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return current, peak
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else USERS
+    print(f"{n:,} users")
+    print(f"{'layout':<14} {'retained':>12} {'per user':>10} {'peak':>12}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "levels.json")
+        write_levels(path, n)
+        for name, build in (("nested dict", nested_dict), ("LevelStore", level_store)):
+            current, peak = measure(build, path)
+            results[name] = current
+            print(f"{name:<14} {current / 2**20:>10.1f}MB {current / n:>9.0f}B {peak / 2**20:>10.1f}MB")
+
+    print(f"reduction: {results['nested dict'] / results['LevelStore']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
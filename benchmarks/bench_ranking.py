@@ -0,0 +1,66 @@
+"""Compare GuildRanking with the old sort-per-command rank lookup.
+
+Run from the repository root:  python -m benchmarks.bench_ranking
+"""
+import random
+import time
+
+from cogs.leveling.ranking import GuildRanking
+from cogs.leveling.records import GuildTable
+
+SIZES = (10_000, 100_000, 1_000_000)
+LOOKUPS = 20
+
+
+def synthetic_guild(n, rng):
+    return {
+        str(100000000000000000 + i): {
+            "xp": rng.randrange(0, 500),
+            "level": rng.randrange(0, 50),
+            "prestige": rng.randrange(0, 3),
+        }
+        for i in range(n)
+    }
+
+
+def sorted_rank(guild, uid):
+    # What Leveling.rank did before: sort the guild, then scan for the caller
+    ordered = sorted(guild.items(), key=lambda x: (x[1]["prestige"], x[1]["level"], x[1]["xp"]), reverse=True)
+    return next(i + 1 for i, (u, _) in enumerate(ordered) if u == uid)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'users':>10} {'sort+scan':>12} {'build':>10} {'update':>10} {'position':>10} {'top 10':>10}")
+
+    for n in SIZES:
+        guild = synthetic_guild(n, rng)
+        uids = rng.sample(list(guild), LOOKUPS)
+
+        old = sum(timed(sorted_rank, guild, uid) for uid in uids[:3]) / 3
+        table = GuildTable.from_json(guild)
+        rows = [table.index[int(uid)] for uid in uids]
+        build = timed(GuildRanking, table)
+        ranking = GuildRanking(table)
+
+        update = 0.0
+        for row in rows:
+            table.xp[row] += 10
+            update += timed(ranking.update, row)
+        position = sum(timed(ranking.position, row) for row in rows)
+        top = sum(timed(ranking.top, 10) for _ in uids)
+
+        print(
+            f"{n:>10,} {old * 1e3:>10.1f}ms {build * 1e3:>8.0f}ms "
+            f"{update / LOOKUPS * 1e6:>8.1f}us {position / LOOKUPS * 1e6:>8.1f}us {top / LOOKUPS * 1e6:>8.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Anti-nuke rate tracking during a nuke burst: old list rebuild vs SlidingWindow.
+
+Simulates one executor deleting 500 channels a second, plus background noise
+from many idle guilds. Run from the repository root:  python -m benchmarks.bench_window
+"""
+import time
+
+from cogs.antinuke.window import SlidingWindow
+
+TIME_WINDOW = 10
+RATE = 500          # deletes per second
+SECONDS = 30
+IDLE_GUILDS = 10_000
+
+
+def old_track(actions, guild_id, user_id, action, now):
+    # AntiNuke.track before the SlidingWindow
+    actions.setdefault(guild_id, {}).setdefault(user_id, {}).setdefault(action, [])
+    actions[guild_id][user_id][action].append(now)
+    actions[guild_id][user_id][action] = [
+        t for t in actions[guild_id][user_id][action]
+        if now - t <= TIME_WINDOW
+    ]
+    return len(actions[guild_id][user_id][action])
+
+
+def events():
+    step = 1 / RATE
+    for i in range(RATE * SECONDS):
+        yield i * step
+
+
+def run_old():
+    actions = {}
+    for g in range(IDLE_GUILDS):
+        old_track(actions, g, 1, "channel_delete", 0.0)
+
+    start = time.perf_counter()
+    for now in events():
+        old_track(actions, -1, 42, "channel_delete", now)
+    elapsed = time.perf_counter() - start
+    return elapsed, sum(len(users) for users in actions.values())
+
+
+def run_window():
+    window = SlidingWindow(TIME_WINDOW, sweep_interval=5)
+    for g in range(IDLE_GUILDS):
+        window.hit((g, 1, "channel_delete"), 0.0)
+
+    start = time.perf_counter()
+    for now in events():
+        window.hit((-1, 42, "channel_delete"), now)
+    elapsed = time.perf_counter() - start
+    return elapsed, len(window)
+
+
+def main():
+    n = RATE * SECONDS
+    print(f"{n:,} events at {RATE}/s, window {TIME_WINDOW}s, {IDLE_GUILDS:,} idle guilds")
+    print(f"{'tracker':<14} {'total':>10} {'per event':>12} {'keys left':>10}")
+    for name, run in (("list rebuild", run_old), ("SlidingWindow", run_window)):
+        elapsed, keys = run()
+        print(f"{name:<14} {elapsed * 1e3:>8.1f}ms {elapsed / n * 1e6:>10.2f}us {keys:>10,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,6 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 WARN_FILE = "warnings.json"
-LOG_CHANNEL_ID = 123456789012345678  # <-- Replace with your logging channel ID
 
 PRIMARY = discord.Colour.from_rgb(88, 101, 242)
 SUCCESS = discord.Colour.green()
@@ -93,6 +92,9 @@ class AdminPanelView(discord.ui.View):
         embed = discord.Embed(title="🛡️ Anti-Raid Protection", colour=PRIMARY)
         embed.add_field(name="Enable", value="`.raidenable`", inline=False)
         embed.add_field(name="Disable", value="`.raiddisable`", inline=False)
+        cog = self.bot.get_cog("AntiAltRaid")
+        if cog:
+            embed.add_field(name="Raid Mode", value=cog.raid_status(interaction.guild.id), inline=False)
         await interaction.response.edit_message(embed=embed, view=self)
 
     # ---------------- BACKUPS ---------------- #
@@ -152,8 +154,9 @@ class Admin(commands.Cog):
     # ---------------------------
     # Logging helper
     async def log_action(self, ctx, action: str, target: discord.Member = None, reason: str = None):
-        log_channel = ctx.guild.get_channel(LOG_CHANNEL_ID)
-        if log_channel is None:
+        # Goes to the guild's moderation log route, batched with the other logs
+        logs = self.bot.get_cog("Logs")
+        if logs is None:
             return
         embed = discord.Embed(title="Admin Action Log", color=DANGER, timestamp=datetime.utcnow())
         embed.add_field(name="Action", value=action, inline=False)
@@ -162,7 +165,7 @@ class Admin(commands.Cog):
             embed.add_field(name="Target", value=target.mention, inline=False)
         if reason:
             embed.add_field(name="Reason / Details", value=reason, inline=False)
-        await log_channel.send(embed=embed)
+        logs.log_message(embed, "moderation", ctx.guild)
 
     # ---------------------------
     # Automatic actions based on warnings
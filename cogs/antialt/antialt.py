@@ -1,19 +1,29 @@
 import discord
-from discord.ext import commands
-from datetime import datetime, timedelta
-from collections import deque
+from discord.ext import commands, tasks
 import logging
 import settings
+from cogs.antialt.response import RaidMode, RaidResponder
+from cogs.antialt.scoring import JoinScorer
+from cogs.antinuke.window import SlidingWindow
 
 logger = logging.getLogger(__name__)
 
 class AntiAltRaid(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.recent_joins = {}  # guild_id: deque of join times
+        self.recent_joins = SlidingWindow(settings.ANTI_RAID_TIME_FRAME)  # guild_id -> recent (join time, member id)
+        self.responder = RaidResponder(settings.ANTI_RAID_CONCURRENCY, exempt=settings.ADMIN_IDS)
+        self.raid_mode = RaidMode(settings.ANTI_RAID_MODE_MIN_DURATION, settings.ANTI_RAID_COOLDOWN_RATE)
+        self.scorer = JoinScorer(settings.ANTI_ALT_CLUSTER_WINDOW, settings.ANTI_ALT_CLUSTER_SIZE)
         self.anti_alt_enabled = settings.ANTI_ALT_ENABLED
         self.anti_raid_enabled = settings.ANTI_RAID_ENABLED
 
+    async def cog_load(self):
+        self.raid_watch.start()
+
+    async def cog_unload(self):
+        self.raid_watch.cancel()
+
     # ---------------------------
     # Anti-Alt check
     @commands.Cog.listener()
@@ -23,8 +33,12 @@ class AntiAltRaid(commands.Cog):
             return
 
         if self.anti_alt_enabled:
-            account_age = (datetime.utcnow() - member.created_at).days
-            if account_age < settings.ANTI_ALT_MIN_ACCOUNT_AGE:
+            await self.check_cluster(member)
+
+            # Members already kicked/banned with their cluster are left alone
+            account_age = (discord.utils.utcnow() - member.created_at).days
+            claimed = self.responder.claimed(member.guild.id, member.id)
+            if account_age < settings.ANTI_ALT_MIN_ACCOUNT_AGE and not claimed:
                 try:
                     action = settings.ANTI_ALT_ACTION
                     if action == "kick":
@@ -38,41 +52,69 @@ class AntiAltRaid(commands.Cog):
         if self.anti_raid_enabled:
             await self.track_join(member)
 
+    # ---------------------------
+    # Waves of similar accounts, however old
+    async def check_cluster(self, member: discord.Member):
+        members = self.scorer.observe(
+            member.guild.id, member.id, member.name, member.created_at.timestamp(), member.avatar is None
+        )
+        if not members:
+            return
+
+        action = settings.ANTI_ALT_CLUSTER_ACTION
+        if action not in ("kick", "ban"):
+            logger.warning(
+                f"Anti-Alt: {len(members)} similar accounts created together joined {member.guild.name}: "
+                f"{', '.join(map(str, sorted(members)))}"
+            )
+            return
+
+        reason = "Anti-Alt: join cluster (similar names, accounts created together)"
+        count = await self.responder.respond(member.guild, members, action, reason=reason)
+        if count:
+            logger.warning(f"{reason} in {member.guild.name}, action: {action} on {count} members")
+
     # ---------------------------
     # Track joins for anti-raid
     async def track_join(self, member: discord.Member):
-        guild_id = member.guild.id
-        if guild_id not in self.recent_joins:
-            self.recent_joins[guild_id] = deque()
-
-        now = datetime.utcnow()
-        self.recent_joins[guild_id].append(now)
+        guild = member.guild
+        count = self.recent_joins.hit(guild.id, value=member.id)
 
-        # remove old timestamps
-        timeframe = timedelta(seconds=settings.ANTI_RAID_TIME_FRAME)
-        while self.recent_joins[guild_id] and now - self.recent_joins[guild_id][0] > timeframe:
-            self.recent_joins[guild_id].popleft()
+        # Join gate: during a raid each join is handled on arrival, no sweep
+        if guild.id in self.raid_mode:
+            self.raid_mode.actioned(guild.id, await self.responder.respond(guild, [member.id], settings.RAID_ACTION))
+            return
 
-        if len(self.recent_joins[guild_id]) > settings.ANTI_RAID_MAX_JOIN_RATE:
-            await self.handle_raid(member.guild)
+        if count > settings.ANTI_RAID_MAX_JOIN_RATE and self.raid_mode.enter(guild.id):
+            logger.warning(f"Raid mode enabled in {guild.name}")
+            await self.handle_raid(guild)
 
     # ---------------------------
     # Handle raid
     async def handle_raid(self, guild: discord.Guild):
+        # Only the joins inside the window; members already handled this raid are skipped
         action = settings.RAID_ACTION
-        for member in guild.members:
-            if member.id in settings.ADMIN_IDS:
-                continue
-
-            try:
-                if action == "kick":
-                    await member.kick(reason="Anti-Raid: detected raid join")
-                elif action == "ban":
-                    await member.ban(reason="Anti-Raid: detected raid join")
-            except Exception as e:
-                logger.error(f"Failed to {action} {member} during raid protection: {e}")
+        count = await self.responder.respond(guild, self.recent_joins.recent(guild.id), action)
+        self.raid_mode.actioned(guild.id, count)
+        if count:
+            logger.warning(f"Anti-Raid triggered in {guild.name}, action: {action} on {count} members")
 
-        logger.warning(f"Anti-Raid triggered in {guild.name}, action: {action}")
+    # ---------------------------
+    # Leave raid mode once joins calm down
+    @tasks.loop(seconds=5)
+    async def raid_watch(self):
+        for guild_id, state in self.raid_mode.calmed(self.recent_joins.count):
+            # Joins still inside the window stay handled, or a new trigger would act on them again
+            self.responder.forget(guild_id, keep=self.recent_joins.recent(guild_id))
+            guild = self.bot.get_guild(guild_id)
+            logger.warning(f"Raid mode ended in {guild.name if guild else guild_id}, {state.actioned} members actioned")
+
+    def raid_status(self, guild_id: int):
+        status = self.raid_mode.status(guild_id)
+        if status is None:
+            return "Off"
+        active, actioned = status
+        return f"🚨 Active for {int(active)}s, {actioned} joins actioned"
 
     # ---------------------------
     # Admin commands
@@ -82,8 +124,17 @@ class AntiAltRaid(commands.Cog):
         embed = discord.Embed(title="Anti-Alt / Raid Status", color=discord.Color.blue())
         embed.add_field(name="Anti-Alt", value=f"{'Enabled' if self.anti_alt_enabled else 'Disabled'}", inline=False)
         embed.add_field(name="Anti-Raid", value=f"{'Enabled' if self.anti_raid_enabled else 'Disabled'}", inline=False)
+        embed.add_field(name="Raid Mode", value=self.raid_status(ctx.guild.id), inline=False)
         await ctx.send(embed=embed)
 
+    @antiraid.command(name="end")
+    @commands.has_permissions(administrator=True)
+    async def end(self, ctx):
+        if self.raid_mode.exit(ctx.guild.id) is None:
+            return await ctx.send("❌ Raid mode is not active.")
+        self.responder.forget(ctx.guild.id, keep=self.recent_joins.recent(ctx.guild.id))
+        await ctx.send("✅ Raid mode ended.")
+
     @antiraid.command(name="enable")
     @commands.has_permissions(administrator=True)
     async def enable(self, ctx, system: str):
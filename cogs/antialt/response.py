@@ -0,0 +1,171 @@
+import logging
+import time
+from collections import OrderedDict
+
+import discord
+
+from cogs.concurrency import run_bounded
+
+logger = logging.getLogger(__name__)
+
+
+# ================================
+#         RAID RESPONDER
+# ================================
+
+class RaidResponder:
+    """Kicks or bans a set of raid joins, each member at most once per raid.
+
+    Bans go out through ``Guild.bulk_ban`` in chunks of up to 200; kicks, and
+    bans if bulk ban is refused, go through ``concurrency`` workers. Members
+    already actioned are remembered for ``memory`` seconds, so overlapping
+    triggers during one raid only act on joins the earlier ones missed. They are
+    kept in claim order, so expired ones are popped off the front and a claim
+    costs amortised O(1) per member.
+    """
+
+    BULK_BAN_LIMIT = 200
+
+    def __init__(self, concurrency=5, memory=600, exempt=()):
+        self.concurrency = concurrency
+        self.memory = memory
+        self.exempt = set(exempt)
+        self.actioned = 0
+        self._handled = {}                # guild_id -> OrderedDict of member_id -> handled_at, oldest first
+
+    def _claim(self, guild_id, member_ids, now):
+        handled = self._handled.get(guild_id)
+        if handled is None:
+            handled = self._handled[guild_id] = OrderedDict()
+        while handled:
+            member_id, at = next(iter(handled.items()))
+            if now - at <= self.memory:
+                break
+            del handled[member_id]
+
+        fresh = []
+        for member_id in member_ids:
+            if member_id in handled or member_id in self.exempt:
+                continue
+            handled[member_id] = now
+            fresh.append(member_id)
+        return fresh
+
+    def claimed(self, guild_id, member_id, now=None):
+        """Whether ``member_id`` was already handled recently."""
+        at = self._handled.get(guild_id, {}).get(member_id)
+        return at is not None and (time.monotonic() if now is None else now) - at <= self.memory
+
+    def forget(self, guild_id, keep=()):
+        """Drop a guild's handled members once its raid is over, except those in ``keep``."""
+        handled = self._handled.pop(guild_id, None)
+        if handled and keep:
+            keep = set(keep)
+            kept = OrderedDict((m, at) for m, at in handled.items() if m in keep)
+            if kept:
+                self._handled[guild_id] = kept
+
+    async def respond(self, guild: discord.Guild, member_ids, action, reason="Anti-Raid: detected raid join"):
+        """Apply ``action`` ("kick" or "ban") to ``member_ids`` not already handled; returns how many were sent."""
+        if action not in ("kick", "ban"):
+            return 0
+        targets = self._claim(guild.id, member_ids, time.monotonic())
+        sent = len(targets)
+        if not targets:
+            return 0
+
+        if action == "ban":
+            targets = await self._bulk_ban(guild, targets, reason)
+
+        async def act(member_id):
+            if action == "ban":
+                await guild.ban(discord.Object(member_id), reason=reason)
+            else:
+                await guild.kick(discord.Object(member_id), reason=reason)
+
+        def failed(member_id, e):
+            logger.error(f"Failed to {action} {member_id} during raid protection: {e}")
+
+        self.actioned += len(await run_bounded(targets, act, self.concurrency, failed))
+        return sent
+
+    async def _bulk_ban(self, guild, targets, reason):
+        """Ban ``targets`` in bulk; returns whatever still needs banning one by one."""
+        for start in range(0, len(targets), self.BULK_BAN_LIMIT):
+            chunk = targets[start:start + self.BULK_BAN_LIMIT]
+            try:
+                result = await guild.bulk_ban([discord.Object(m) for m in chunk], reason=reason)
+            except discord.HTTPException as e:
+                logger.warning(f"Bulk ban refused in {guild.name}, falling back to single bans: {e}")
+                return targets[start:]
+            self.actioned += len(result.banned)
+            if result.failed:
+                logger.error(f"Bulk ban failed for {len(result.failed)} raid joins in {guild.name}")
+        return []
+
+
+# ================================
+#           RAID MODE
+# ================================
+
+class RaidState:
+    __slots__ = ("started", "actioned")
+
+    def __init__(self, started):
+        self.started = started
+        self.actioned = 0
+
+
+class RaidMode:
+    """Per-guild raid mode: entered once when the join rate trips, left once it calms down.
+
+    While a guild is in raid mode every join is actioned as it arrives, so a
+    raid costs one action per join instead of a new sweep per join. Raid mode
+    lasts at least ``min_duration`` seconds, then ends as soon as the window
+    holds ``cooldown_rate`` joins or fewer.
+    """
+
+    def __init__(self, min_duration=60, cooldown_rate=2):
+        self.min_duration = min_duration
+        self.cooldown_rate = cooldown_rate
+        self.raids = {}                   # guild_id -> RaidState
+
+    def __contains__(self, guild_id):
+        return guild_id in self.raids
+
+    def enter(self, guild_id, now=None):
+        """Switch ``guild_id`` into raid mode; returns False if it already was."""
+        if guild_id in self.raids:
+            return False
+        self.raids[guild_id] = RaidState(time.monotonic() if now is None else now)
+        return True
+
+    def exit(self, guild_id):
+        """Leave raid mode now; returns the guild's :class:`RaidState`, or None if it wasn't in raid mode."""
+        return self.raids.pop(guild_id, None)
+
+    def actioned(self, guild_id, count=1):
+        state = self.raids.get(guild_id)
+        if state is not None:
+            state.actioned += count
+
+    def calmed(self, join_counts, now=None):
+        """End raid mode where it has run its course; ``join_counts(guild_id)`` gives the current window count.
+
+        Returns ``(guild_id, RaidState)`` for each guild that left raid mode.
+        """
+        now = time.monotonic() if now is None else now
+        ended = [
+            (guild_id, state) for guild_id, state in self.raids.items()
+            if now - state.started >= self.min_duration and join_counts(guild_id) <= self.cooldown_rate
+        ]
+        for guild_id, _ in ended:
+            del self.raids[guild_id]
+        return ended
+
+    def status(self, guild_id, now=None):
+        """``(seconds active, members actioned)`` or None when not in raid mode."""
+        state = self.raids.get(guild_id)
+        if state is None:
+            return None
+        return (time.monotonic() if now is None else now) - state.started, state.actioned
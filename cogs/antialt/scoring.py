@@ -0,0 +1,61 @@
+import re
+import time
+
+from cogs.antinuke.window import SlidingWindow
+
+
+def name_skeleton(name):
+    """Lowercased name with every run of digits collapsed, so ``raider0412`` and ``raider77`` match."""
+    return re.sub(r"\d+", "#", name.lower())
+
+
+def trigrams(text):
+    text = f"^{text}$"
+    return {text[i:i + 3] for i in range(len(text) - 2)} or {text}
+
+
+class JoinScorer:
+    """Spots waves of near-identical accounts joining together, at a fixed cost per join.
+
+    Every join is filed under ``2 * bands`` hash keys. Each key combines the
+    account's creation-time bucket, whether it still has the default avatar, and
+    one locality-sensitive band of a MinHash over its name trigrams. Creation time
+    is bucketed on two ``bucket``-second grids offset by half a bucket, so accounts
+    made within ``bucket / 2`` seconds of each other always share a bucket. Two joins share a key only if their accounts were made in the same
+    sitting *and* their names differ by a few characters at most, so ordinary
+    joins with similar names ("john", "john2") don't cluster on the name alone.
+
+    Each key keeps the members who hit it in the last ``window`` seconds. When a
+    key reaches ``cluster_size`` members, all of them are reported, including the
+    ones that joined before the cluster was recognisable.
+    """
+
+    def __init__(self, window=300, cluster_size=5, bucket=600, bands=6, rows=3):
+        self.cluster_size = cluster_size
+        self.bucket = bucket
+        self.bands = bands
+        self.rows = rows
+        self.index = SlidingWindow(window)  # (guild_id, key) -> recent (join time, member id)
+
+    def _name_bands(self, name):
+        grams = trigrams(name_skeleton(name))
+        signature = [min(hash((seed, g)) for g in grams) for seed in range(self.bands * self.rows)]
+        return [hash(tuple(signature[band * self.rows:(band + 1) * self.rows])) for band in range(self.bands)]
+
+    def keys(self, name, created_at, default_avatar):
+        """Cluster keys for an account; ``created_at`` is a POSIX timestamp."""
+        bands = list(enumerate(self._name_bands(name)))
+        return [
+            (grid, int((created_at + grid * self.bucket / 2) // self.bucket), default_avatar, band, h)
+            for grid in (0, 1)
+            for band, h in bands
+        ]
+
+    def observe(self, guild_id, member_id, name, created_at, default_avatar, now=None):
+        """File a join and return the IDs of every member in a cluster it completes (empty if none)."""
+        now = time.monotonic() if now is None else now
+        members = set()
+        for key in self.keys(name, created_at, default_avatar):
+            if self.index.hit((guild_id, key), now, member_id) >= self.cluster_size:
+                members.update(self.index.recent((guild_id, key), now))
+        return members
@@ -1,6 +1,6 @@
 import discord
-from discord.ext import commands
-import time
+from discord.ext import commands, tasks
+import asyncio
 import json
 import os
 import logging
@@ -15,42 +15,81 @@ from settings import (
     TIMEOUT_MINUTES,
     PANIC_ROLE_NAME,
     PANIC_CHANNEL_NAME,
-    BACKUP_FILE
+    BACKUP_FILE,
+    RESTORE_CONCURRENCY,
+    SNAPSHOT_DIR,
+    SNAPSHOT_KEEP,
+    AUTO_SNAPSHOT_ENABLED,
+    SNAPSHOT_QUIET_PERIOD,
+    SNAPSHOT_NUKE_HOLD,
+    PANIC_CONCURRENCY
 )
 
+from cogs.antinuke.backup import capture
+from cogs.antinuke.lockdown import LockdownExecutor
+from cogs.antinuke.pipeline import AUDIT_ONLY, DETECTORS, EventPipeline, NukeEvent
+from cogs.antinuke.resolver import ExecutorResolver
+from cogs.antinuke.restore import RestoreRunner
+from cogs.antinuke.snapshots import SnapshotScheduler, SnapshotStore
+from cogs.antinuke.window import SlidingWindow
+
 logger = logging.getLogger(__name__)
 
 class AntiNuke(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.actions = {}
+        self.actions = SlidingWindow(TIME_WINDOW)  # (guild_id, user_id, action) -> recent timestamps
+        self.resolver = ExecutorResolver()
+        self.restorer = RestoreRunner(concurrency=RESTORE_CONCURRENCY)
+        self.snapshots = SnapshotStore(SNAPSHOT_DIR, keep=SNAPSHOT_KEEP)
+        self.schedule = SnapshotScheduler(quiet=SNAPSHOT_QUIET_PERIOD)
+        self.lockdown = LockdownExecutor(SNAPSHOT_DIR, concurrency=PANIC_CONCURRENCY)
+        self.pipeline = EventPipeline(self.resolve_event, self.handle_event)
         logger.info("Anti-Nuke cog loaded")
 
+    async def cog_load(self):
+        if AUTO_SNAPSHOT_ENABLED:
+            self.auto_snapshot.start()
+
+    async def cog_unload(self):
+        self.auto_snapshot.cancel()
+        self.pipeline.close()
+
     # -------------------------
     # Utilities
     def is_owner(self, user_id: int):
         return user_id in ANTI_NUKE_OWNERS
 
     def track(self, guild_id: int, user_id: int, action: str):
-        now = time.time()
-        self.actions.setdefault(guild_id, {}).setdefault(user_id, {}).setdefault(action, [])
-        self.actions[guild_id][user_id][action].append(now)
-
-        # cleanup
-        self.actions[guild_id][user_id][action] = [
-            t for t in self.actions[guild_id][user_id][action]
-            if now - t <= TIME_WINDOW
-        ]
-
-        return len(self.actions[guild_id][user_id][action])
+        # Keep auto-snapshots off while an attack could still be in progress
+        self.schedule.hold(guild_id, TIME_WINDOW)
+        return self.actions.hit((guild_id, user_id, action))
+
+    async def get_executor(self, guild: discord.Guild, action, target_id: int, since=None):
+        """ID of whoever performed ``action`` on ``target_id``, from the audit log."""
+        return await self.resolver.resolve(guild, action, target_id, since)
+
+    def feed(self, guild: discord.Guild, kind: str, target_id: int, executor_id: int = None):
+        if ANTI_NUKE_ENABLED and kind in ANTI_NUKE_LIMITS:
+            self.pipeline.put(NukeEvent(guild, kind, target_id, executor_id))
+
+    async def resolve_event(self, event: NukeEvent):
+        detector = DETECTORS[event.kind]
+        since = event.seen_at if detector.repeats else None
+        return await self.get_executor(event.guild, detector.action, event.target_id, since)
+
+    async def handle_event(self, event: NukeEvent):
+        # Our own restores create channels and roles too
+        if self.is_owner(event.executor_id) or event.executor_id == self.bot.user.id:
+            return
 
-    async def get_executor(self, guild: discord.Guild, action):
-        try:
-            async for entry in guild.audit_logs(limit=1, action=action):
-                return entry.user
-        except Exception as e:
-            logger.error("Audit log error", exc_info=e)
-        return None
+        count = self.track(event.guild.id, event.executor_id, event.kind)
+        if count >= ANTI_NUKE_LIMITS[event.kind]:
+            member = event.guild.get_member(event.executor_id)
+            if member:
+                await self.punish(event.guild, member)
+            if DETECTORS[event.kind].restore:
+                await self.restore(event.guild)
 
     async def punish(self, guild: discord.Guild, member: discord.Member):
         if self.is_owner(member.id):
@@ -72,52 +111,73 @@ class AntiNuke(commands.Cog):
     @commands.command(name="backup")
     @commands.has_permissions(administrator=True)
     async def backup(self, ctx):
-        data = {
-            "roles": [],
-            "channels": []
-        }
-
-        for role in ctx.guild.roles:
-            if role.is_default():
-                continue
-            data["roles"].append({
-                "name": role.name,
-                "permissions": role.permissions.value,
-                "color": role.color.value,
-                "hoist": role.hoist,
-                "mentionable": role.mentionable
-            })
-
-        for ch in ctx.guild.channels:
-            data["channels"].append({
-                "name": ch.name,
-                "type": ch.type.name,
-                "category": ch.category.name if ch.category else None
-            })
-
-        with open(BACKUP_FILE, "w") as f:
-            json.dump(data, f, indent=4)
-
-        await ctx.send("📦 Server backup saved.")
+        version = await asyncio.to_thread(self.snapshots.save, ctx.guild.id, capture(ctx.guild))
 
-    async def restore(self, guild: discord.Guild):
-        if not os.path.exists(BACKUP_FILE):
-            return
+        if version is None:
+            await ctx.send("📦 Nothing changed since the last backup.")
+        else:
+            await ctx.send(f"📦 Server backup saved as version **{version}**.")
 
+    @commands.command(name="backups")
+    @commands.has_permissions(administrator=True)
+    async def backups(self, ctx):
+        versions = await asyncio.to_thread(self.snapshots.versions, ctx.guild.id)
+        if not versions:
+            return await ctx.send("No backups saved for this server.")
+
+        lines = []
+        previous = None
+        for version, ts, roles, channels in versions[-10:]:
+            line = f"**{version}** · {ts[:19].replace('T', ' ')} · {roles} roles, {channels} channels"
+            if previous is not None:
+                diff = await asyncio.to_thread(self.snapshots.diff, ctx.guild.id, previous, version)
+                changes = sum(len(ids) for kind in diff.values() for ids in kind.values())
+                line += f" · {changes} changed"
+            lines.append(line)
+            previous = version
+
+        await ctx.send(embed=discord.Embed(title="📦 Backups", description="\n".join(lines), color=discord.Color.red()))
+
+    async def load_backup(self, guild: discord.Guild):
+        snapshot = await asyncio.to_thread(self.snapshots.load, guild.id)
+        if snapshot is not None or not os.path.exists(BACKUP_FILE):
+            return snapshot
+
+        # Global backup written before per-guild snapshots existed
         with open(BACKUP_FILE) as f:
-            data = json.load(f)
+            return json.load(f)
 
-        for r in data["roles"]:
-            await guild.create_role(
-                name=r["name"],
-                permissions=discord.Permissions(r["permissions"]),
-                color=discord.Color(r["color"]),
-                hoist=r["hoist"],
-                mentionable=r["mentionable"]
-            )
+    async def restore(self, guild: discord.Guild):
+        # Only recreates what is missing; repeat triggers during a burst share one restore
+        self.schedule.hold(guild.id, SNAPSHOT_NUKE_HOLD)
+        self.restorer.request(guild, lambda: self.load_backup(guild))
 
-        for c in data["channels"]:
-            await guild.create_text_channel(c["name"])
+    # -------------------------
+    # Auto Snapshots
+    @tasks.loop(seconds=5)
+    async def auto_snapshot(self):
+        for guild_id in self.schedule.due():
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                continue
+            try:
+                # capture() only reads the cache; the disk write happens off the loop
+                version = await asyncio.to_thread(self.snapshots.save, guild_id, capture(guild))
+                if version is not None:
+                    logger.info(f"Auto-snapshot of {guild.name} saved as version {version}")
+            except Exception as e:
+                logger.error(f"Auto-snapshot failed for {guild}", exc_info=e)
+
+    @auto_snapshot.before_loop
+    async def before_auto_snapshot(self):
+        await self.bot.wait_until_ready()
+        # Baseline on startup; unchanged guilds don't get a new version
+        for guild in self.bot.guilds:
+            self.schedule.mark(guild.id, now=0.0)
+
+    def structure_changed(self, guild: discord.Guild):
+        if AUTO_SNAPSHOT_ENABLED:
+            self.schedule.mark(guild.id)
 
     # -------------------------
     # Panic Mode
@@ -128,14 +188,32 @@ class AntiNuke(commands.Cog):
         if not role:
             role = await ctx.guild.create_role(name=PANIC_ROLE_NAME)
 
-        for channel in ctx.guild.channels:
-            await channel.set_permissions(
-                ctx.guild.default_role,
-                send_messages=False,
-                connect=False
-            )
+        status = await ctx.send("🚨 PANIC MODE: locking channels...")
+        if not await self.lockdown.lock(ctx.guild, self.lockdown_progress(status, "🚨 PANIC MODE", "locked")):
+            await status.edit(content="⚠️ A lockdown change is already running for this server.")
 
-        await ctx.send("🚨 PANIC MODE ACTIVATED")
+    @commands.command(name="unpanic")
+    @commands.has_permissions(administrator=True)
+    async def unpanic(self, ctx):
+        if not await asyncio.to_thread(self.lockdown.saved, ctx.guild.id):
+            return await ctx.send("Nothing to unlock.")
+
+        status = await ctx.send("🔓 Lifting panic mode...")
+        if not await self.lockdown.unlock(ctx.guild, self.lockdown_progress(status, "🔓 Panic mode", "restored")):
+            await status.edit(content="⚠️ A lockdown change is already running for this server.")
+
+    def lockdown_progress(self, status: discord.Message, title: str, verb: str):
+        # One status message edited every couple of seconds instead of a message per channel
+        async def update(done, failed, total, final):
+            text = f"{title}: {done}/{total} channels {verb}"
+            if failed:
+                text += f", {failed} failed"
+            text += " ✅" if final and not failed else ("" if final else "...")
+            try:
+                await status.edit(content=text)
+            except discord.HTTPException:
+                pass
+        return update
 
     # -------------------------
     # Status
@@ -149,56 +227,62 @@ class AntiNuke(commands.Cog):
         embed.add_field(name="Owners Immune", value=len(ANTI_NUKE_OWNERS))
         embed.add_field(name="Punishment", value=ANTI_NUKE_PUNISHMENT)
         embed.add_field(name="Time Window", value=f"{TIME_WINDOW}s")
+        embed.add_field(name="Audit Log Fetches", value=self.resolver.fetches)
+        embed.add_field(name="Watched Actions", value=", ".join(k for k in DETECTORS if k in ANTI_NUKE_LIMITS))
+        embed.add_field(name="Auto Snapshots", value="Held" if self.schedule.held(ctx.guild.id) else AUTO_SNAPSHOT_ENABLED)
         await ctx.send(embed=embed)
 
     # -------------------------
     # EVENTS
     @commands.Cog.listener()
-    async def on_guild_channel_delete(self, channel):
-        if not ANTI_NUKE_ENABLED:
-            return
+    async def on_audit_log_entry_create(self, entry: discord.AuditLogEntry):
+        # Push path: lets get_executor match events without fetching the audit log
+        self.resolver.record(entry)
 
-        executor = await self.get_executor(channel.guild, discord.AuditLogAction.channel_delete)
-        if not executor or self.is_owner(executor.id):
-            return
+        kind = AUDIT_ONLY.get(entry.action)
+        if kind and entry.user_id:
+            self.feed(entry.guild, kind, getattr(entry.target, "id", None), entry.user_id)
 
-        count = self.track(channel.guild.id, executor.id, "channel_delete")
-        if count >= ANTI_NUKE_LIMITS["channel_delete"]:
-            member = channel.guild.get_member(executor.id)
-            if member:
-                await self.punish(channel.guild, member)
-                await self.restore(channel.guild)
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        self.structure_changed(channel.guild)
+        self.feed(channel.guild, "channel_create", channel.id)
 
     @commands.Cog.listener()
-    async def on_guild_role_delete(self, role):
-        if not ANTI_NUKE_ENABLED:
-            return
+    async def on_guild_channel_update(self, before, after):
+        self.structure_changed(after.guild)
 
-        executor = await self.get_executor(role.guild, discord.AuditLogAction.role_delete)
-        if not executor or self.is_owner(executor.id):
-            return
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.structure_changed(channel.guild)
+        self.feed(channel.guild, "channel_delete", channel.id)
 
-        count = self.track(role.guild.id, executor.id, "role_delete")
-        if count >= ANTI_NUKE_LIMITS["role_delete"]:
-            member = role.guild.get_member(executor.id)
-            if member:
-                await self.punish(role.guild, member)
-                await self.restore(role.guild)
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role):
+        self.structure_changed(role.guild)
+        self.feed(role.guild, "role_create", role.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before, after):
+        self.structure_changed(after.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        self.structure_changed(role.guild)
+        self.feed(role.guild, "role_delete", role.id)
 
     @commands.Cog.listener()
     async def on_guild_update(self, before, after):
-        if not ANTI_NUKE_ENABLED:
-            return
+        self.feed(after, "guild_update", after.id)
 
-        executor = await self.get_executor(after, discord.AuditLogAction.guild_update)
-        if not executor or self.is_owner(executor.id):
-            return
+    @commands.Cog.listener()
+    async def on_member_ban(self, guild, user):
+        self.feed(guild, "member_ban", user.id)
 
-        count = self.track(after.id, executor.id, "guild_update")
-        if count >= ANTI_NUKE_LIMITS["guild_update"]:
-            member = after.get_member(executor.id)
-            if member:
-                await self.punish(after, member)
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        if member.bot:
+            self.feed(member.guild, "bot_add", member.id)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(AntiNuke(bot))
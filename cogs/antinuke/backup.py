@@ -0,0 +1,45 @@
+from datetime import datetime
+
+
+# -------------------------
+# Snapshot format (same shape as antinuke_data/<guild_id>.json "backup")
+
+def capture_role(role):
+    return {
+        "id": role.id,
+        "name": role.name,
+        "permissions": role.permissions.value,
+        "colour": role.colour.value,
+        "hoist": role.hoist,
+        "mentionable": role.mentionable,
+        "position": role.position
+    }
+
+
+def capture_channel(channel):
+    return {
+        "id": channel.id,
+        "name": channel.name,
+        "type": channel.type.name,
+        "position": channel.position,
+        "category_id": channel.category_id,
+        "topic": getattr(channel, "topic", None),
+        "nsfw": getattr(channel, "nsfw", False),
+        "bitrate": getattr(channel, "bitrate", None),
+        "user_limit": getattr(channel, "user_limit", None),
+        "slowmode_delay": getattr(channel, "slowmode_delay", None),
+        "overwrites": {
+            str(target.id): {"allow": allow.value, "deny": deny.value}
+            for target, overwrite in channel.overwrites.items()
+            for allow, deny in (overwrite.pair(),)
+        }
+    }
+
+
+def capture(guild):
+    """Roles and channels of ``guild`` from the local cache; makes no API calls."""
+    return {
+        "roles": [capture_role(role) for role in guild.roles if not role.is_default()],
+        "channels": [capture_channel(channel) for channel in guild.channels],
+        "ts": datetime.utcnow().isoformat()
+    }
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import logging
+import os
+
+import discord
+
+from cogs.concurrency import run_bounded
+
+logger = logging.getLogger(__name__)
+
+
+class LockdownExecutor:
+    """Locks every channel for @everyone in parallel, and undoes it later.
+
+    Overwrite edits are rate-limited per channel, so each channel is its own
+    bucket: ``concurrency`` workers each take one channel at a time and
+    discord.py waits out any 429 on that route without holding up the others.
+    The @everyone overwrite each channel had before is saved to
+    ``<root>/<guild_id>/lockdown.json`` before anything is edited, so an unlock
+    works even after a restart.
+    """
+
+    def __init__(self, root="antinuke_data", concurrency=8, progress_interval=2.0):
+        self.root = root
+        self.concurrency = concurrency
+        self.progress_interval = progress_interval
+        self._running = set()             # guild ids with a lock/unlock in progress
+
+    # ---------------- SAVED OVERWRITES ---------------- #
+
+    def _path(self, guild_id):
+        return os.path.join(self.root, str(guild_id), "lockdown.json")
+
+    def saved(self, guild_id):
+        """channel_id -> [allow, deny] of the prior overwrite, or None if there wasn't one."""
+        path = self._path(guild_id)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return {int(k): v for k, v in json.load(f).items()}
+
+    def _save(self, guild_id, saved):
+        path = self._path(guild_id)
+        if not saved:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({str(k): v for k, v in saved.items()}, f)
+        os.replace(tmp, path)
+
+    # ---------------- FAN-OUT ---------------- #
+
+    async def _fan_out(self, jobs, on_progress):
+        """Run ``(channel_id, coroutine function)`` jobs with ``concurrency`` workers; returns the ids that succeeded."""
+        total = len(jobs)
+        succeeded, failed = [], 0
+
+        async def run(job):
+            channel_id, edit = job
+            await edit()
+            succeeded.append(channel_id)
+
+        def error(job, e):
+            nonlocal failed
+            failed += 1
+            logger.error(f"Lockdown edit failed for channel {job[0]}", exc_info=e)
+
+        async def report():
+            while True:
+                await asyncio.sleep(self.progress_interval)
+                await on_progress(len(succeeded), failed, total, False)
+
+        reporter = asyncio.get_running_loop().create_task(report())
+        try:
+            await run_bounded(jobs, run, self.concurrency, error)
+        finally:
+            reporter.cancel()
+        await on_progress(len(succeeded), failed, total, True)
+        return succeeded
+
+    # ---------------- LOCK / UNLOCK ---------------- #
+
+    async def lock(self, guild: discord.Guild, on_progress):
+        """Deny send_messages/connect for @everyone everywhere. ``await on_progress(done, failed, total, final)`` reports progress."""
+        if guild.id in self._running:
+            return False
+        self._running.add(guild.id)
+        try:
+            everyone = guild.default_role
+            saved = await asyncio.to_thread(self.saved, guild.id)
+            jobs = []
+            for channel in guild.channels:
+                current = channel.overwrites_for(everyone)
+                if current.send_messages is False and current.connect is False:
+                    continue
+                # A repeated panic must not overwrite what the channel looked like before the first one
+                if channel.id not in saved:
+                    prior = channel.overwrites.get(everyone)
+                    saved[channel.id] = None if prior is None else [p.value for p in prior.pair()]
+
+                current.send_messages = False
+                current.connect = False
+                jobs.append((channel.id, lambda c=channel, o=current: c.set_permissions(everyone, overwrite=o, reason="Panic mode")))
+
+            await asyncio.to_thread(self._save, guild.id, saved)
+            await self._fan_out(jobs, on_progress)
+            return True
+        finally:
+            self._running.discard(guild.id)
+
+    async def unlock(self, guild: discord.Guild, on_progress):
+        """Put back the @everyone overwrites saved by :meth:`lock`; channels that fail stay saved for a retry."""
+        if guild.id in self._running:
+            return False
+        self._running.add(guild.id)
+        try:
+            everyone = guild.default_role
+            saved = await asyncio.to_thread(self.saved, guild.id)
+            jobs = []
+            for channel_id, pair in list(saved.items()):
+                channel = guild.get_channel(channel_id)
+                if channel is None:
+                    del saved[channel_id]
+                    continue
+
+                overwrite = None
+                if pair is not None:
+                    overwrite = discord.PermissionOverwrite.from_pair(discord.Permissions(pair[0]), discord.Permissions(pair[1]))
+                jobs.append((channel_id, lambda c=channel, o=overwrite: c.set_permissions(everyone, overwrite=o, reason="Panic mode lifted")))
+
+            for channel_id in await self._fan_out(jobs, on_progress):
+                del saved[channel_id]
+            await asyncio.to_thread(self._save, guild.id, saved)
+            return True
+        finally:
+            self._running.discard(guild.id)
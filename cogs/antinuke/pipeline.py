@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from collections import namedtuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------
+# Detectors
+#
+# One entry per watched action. The key is also the ANTI_NUKE_LIMITS key; an
+# action without a limit there is ignored. ``restore`` runs a restore after the
+# executor is punished. ``repeats`` marks actions whose target can be hit again
+# (the guild itself, a re-banned user, a re-added bot), so older audit entries
+# for the same target must not be matched.
+
+Detector = namedtuple("Detector", "action restore repeats")
+
+DETECTORS = {
+    "channel_delete": Detector(discord.AuditLogAction.channel_delete, True, False),
+    "channel_create": Detector(discord.AuditLogAction.channel_create, False, False),
+    "role_delete": Detector(discord.AuditLogAction.role_delete, True, False),
+    "role_create": Detector(discord.AuditLogAction.role_create, False, False),
+    "guild_update": Detector(discord.AuditLogAction.guild_update, False, True),
+    "webhook_create": Detector(discord.AuditLogAction.webhook_create, False, False),
+    "member_ban": Detector(discord.AuditLogAction.ban, False, True),
+    "member_kick": Detector(discord.AuditLogAction.kick, False, True),
+    "bot_add": Detector(discord.AuditLogAction.bot_add, False, True),
+}
+
+# Actions with no gateway event of their own; they come straight from on_audit_log_entry_create
+AUDIT_ONLY = {
+    DETECTORS["webhook_create"].action: "webhook_create",
+    DETECTORS["member_kick"].action: "member_kick",
+}
+
+
+class NukeEvent:
+    __slots__ = ("guild", "kind", "target_id", "executor_id", "seen_at")
+
+    def __init__(self, guild, kind, target_id, executor_id=None):
+        self.guild = guild
+        self.kind = kind
+        self.target_id = target_id
+        self.executor_id = executor_id
+        self.seen_at = discord.utils.utcnow()
+
+
+# -------------------------
+# Pipeline
+
+class EventPipeline:
+    """Per-guild queue of :class:`NukeEvent`, drained by one consumer task per guild.
+
+    Listeners call :meth:`put` and return immediately. The consumer takes
+    everything queued so far, resolves the executors of the batch concurrently
+    with ``resolve(event)``, then calls ``handle(event)`` for each in arrival
+    order. A guild's consumer exits after ``idle`` seconds with nothing queued.
+    """
+
+    def __init__(self, resolve, handle, idle=60.0, maxsize=1000):
+        self.resolve = resolve
+        self.handle = handle
+        self.idle = idle
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._queues = {}                 # guild_id -> asyncio.Queue
+        self._tasks = {}                  # guild_id -> consumer task
+
+    def put(self, event: NukeEvent):
+        guild_id = event.guild.id
+        queue = self._queues.get(guild_id)
+        if queue is None:
+            queue = self._queues[guild_id] = asyncio.Queue(maxsize=self.maxsize)
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return
+
+        if guild_id not in self._tasks:
+            self._tasks[guild_id] = asyncio.get_running_loop().create_task(self._consume(guild_id, queue))
+
+    async def _consume(self, guild_id, queue):
+        try:
+            while True:
+                try:
+                    batch = [await asyncio.wait_for(queue.get(), self.idle)]
+                except asyncio.TimeoutError:
+                    break
+                while not queue.empty():
+                    batch.append(queue.get_nowait())
+
+                await asyncio.gather(*(self._resolve(event) for event in batch))
+                for event in batch:
+                    if event.executor_id is None:
+                        continue
+                    try:
+                        await self.handle(event)
+                    except Exception as e:
+                        logger.error(f"Anti-nuke handler failed for {event.kind}", exc_info=e)
+        finally:
+            del self._tasks[guild_id]
+            if queue.empty():
+                del self._queues[guild_id]
+
+    async def _resolve(self, event):
+        if event.executor_id is None:
+            try:
+                event.executor_id = await self.resolve(event)
+            except Exception as e:
+                logger.error(f"Failed to resolve executor for {event.kind}", exc_info=e)
+
+    def close(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorResolver:
+    """Works out who performed an audit-logged action, matched by target ID.
+
+    Concurrent lookups for the same (guild, action) share one fetch of the last
+    ``fetch_limit`` entries, and the newest entry seen for each target is cached
+    for ``ttl`` seconds, so a burst of deletes costs a handful of audit-log
+    requests instead of one each. Entries pushed through
+    ``on_audit_log_entry_create`` go into the same cache, and a lookup that still
+    misses waits up to ``wait`` seconds for one.
+
+    Some targets are hit again and again (the guild for ``guild_update``, a
+    re-banned user). Lookups for those pass ``since``, the time the event was
+    seen, and entries created more than ``skew`` seconds before it are ignored,
+    so an earlier action on the same target is never blamed for this one.
+    """
+
+    def __init__(self, fetch_limit=25, ttl=5.0, wait=1.5, max_age=30, skew=2.0):
+        self.fetch_limit = fetch_limit
+        self.ttl = ttl
+        self.wait = wait
+        self.max_age = timedelta(seconds=max_age)
+        self.skew = timedelta(seconds=skew)
+        self.fetches = 0
+        self._entries = OrderedDict()     # (guild_id, action, target_id) -> (user_id, created_at, cached_at), oldest first
+        self._inflight = {}               # (guild_id, action) -> fetch task
+        self._waiters = {}                # (guild_id, action, target_id) -> future
+
+    # ---------------- CACHE ---------------- #
+
+    def _expire(self, now):
+        entries = self._entries
+        while entries:
+            key, (_, _, at) = next(iter(entries.items()))
+            if now - at <= self.ttl:
+                break
+            del entries[key]
+
+    def _store(self, guild_id, action, target_id, user_id, created_at):
+        now = time.monotonic()
+        self._expire(now)
+        key = (guild_id, action, target_id)
+        cached = self._entries.get(key)
+        # A fetch walks newest to oldest and a push can land mid-fetch; keep the newest
+        if cached is not None and cached[1] >= created_at:
+            return
+        self._entries.pop(key, None)
+        self._entries[key] = (user_id, created_at, now)
+
+        waiter = self._waiters.get(key)
+        if waiter is not None and not waiter.done():
+            waiter.set_result((user_id, created_at))
+
+    def _lookup(self, guild_id, action, target_id, since=None):
+        hit = self._entries.get((guild_id, action, target_id))
+        if hit is None or time.monotonic() - hit[2] > self.ttl:
+            return None
+        return self._fresh(hit[0], hit[1], since)
+
+    def _fresh(self, user_id, created_at, since):
+        if since is not None and created_at < since - self.skew:
+            return None
+        return user_id
+
+    def record(self, entry):
+        """Cache an entry from ``on_audit_log_entry_create`` or a fetch."""
+        target_id = getattr(entry.target, "id", None)
+        if target_id is None or entry.user_id is None:
+            return
+        # guild_update always targets the guild, so an old entry would match anything
+        if datetime.now(timezone.utc) - entry.created_at > self.max_age:
+            return
+        self._store(entry.guild.id, entry.action, target_id, entry.user_id, entry.created_at)
+
+    # ---------------- FETCHING ---------------- #
+
+    async def _fetch(self, guild, action):
+        self.fetches += 1
+        seen = set()
+        try:
+            async for entry in guild.audit_logs(limit=self.fetch_limit, action=action):
+                # Newest first: an older entry for the same target is an earlier action
+                target_id = getattr(entry.target, "id", None)
+                if target_id in seen:
+                    continue
+                seen.add(target_id)
+                self.record(entry)
+        except Exception as e:
+            logger.error("Audit log error", exc_info=e)
+
+    async def _shared_fetch(self, guild, action):
+        """Join the fetch in flight for (guild, action) or start one; returns True if this call started it."""
+        key = (guild.id, action)
+        task = self._inflight.get(key)
+        started = task is None
+        if started:
+            task = self._inflight[key] = asyncio.get_running_loop().create_task(self._fetch(guild, action))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        await asyncio.shield(task)
+        return started
+
+    async def resolve(self, guild, action, target_id, since=None):
+        """ID of the user who performed ``action`` on ``target_id``, or None.
+
+        ``since`` is when the event was seen, for targets that can be hit repeatedly.
+        """
+        user_id = self._lookup(guild.id, action, target_id, since)
+        if user_id is None:
+            started = await self._shared_fetch(guild, action)
+            user_id = self._lookup(guild.id, action, target_id, since)
+            # A fetch we joined may have gone out before this entry existed
+            if user_id is None and not started:
+                await self._shared_fetch(guild, action)
+                user_id = self._lookup(guild.id, action, target_id, since)
+
+        if user_id is None and self.wait:
+            # Discord can write the entry after the event arrives; the gateway push delivers it
+            key = (guild.id, action, target_id)
+            waiter = self._waiters.get(key)
+            if waiter is None:
+                waiter = self._waiters[key] = asyncio.get_running_loop().create_future()
+            try:
+                user_id = self._fresh(*await asyncio.wait_for(asyncio.shield(waiter), self.wait), since)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                if self._waiters.get(key) is waiter:
+                    del self._waiters[key]
+        return user_id
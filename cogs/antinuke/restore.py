@@ -0,0 +1,166 @@
+import asyncio
+import logging
+
+import discord
+
+from cogs.concurrency import run_bounded
+
+logger = logging.getLogger(__name__)
+
+
+# -------------------------
+# Planning
+
+class RestorePlan:
+    """What a snapshot has that the live guild is missing."""
+
+    def __init__(self, roles, categories, channels):
+        self.roles = roles
+        self.categories = categories
+        self.channels = channels
+
+    def __bool__(self):
+        return bool(self.roles or self.categories or self.channels)
+
+    def __len__(self):
+        return len(self.roles) + len(self.categories) + len(self.channels)
+
+
+def plan_restore(guild: discord.Guild, snapshot):
+    """Diff ``snapshot`` against ``guild`` by ID, falling back to name for snapshots without IDs."""
+    role_names = {role.name for role in guild.roles}
+    channel_names = {(channel.name, channel.type.name) for channel in guild.channels}
+
+    roles = [
+        r for r in snapshot.get("roles", [])
+        if r.get("id") != guild.id
+        and not (r.get("id") and guild.get_role(r["id"]))
+        and r["name"] not in role_names
+    ]
+
+    categories, channels = [], []
+    for c in snapshot.get("channels", []):
+        if c.get("id") and guild.get_channel(c["id"]):
+            continue
+        if (c["name"], c["type"]) in channel_names:
+            continue
+        (categories if c["type"] == "category" else channels).append(c)
+
+    return RestorePlan(roles, categories, channels)
+
+
+# -------------------------
+# Execution
+
+class RestoreRunner:
+    """Recreates whatever a snapshot has that the guild lost, one restore per guild at a time.
+
+    Calls run through a pool of ``concurrency`` slots; discord.py waits out any
+    429s per route on its own. A restore requested while one is running for the
+    same guild is folded into a single follow-up pass instead of stacking up.
+    """
+
+    def __init__(self, concurrency=3):
+        self.concurrency = concurrency
+        self._running = {}                # guild_id -> task
+        self._again = set()               # guild ids that asked for another pass while running
+
+    def request(self, guild: discord.Guild, load_snapshot):
+        """Start a restore for ``guild`` unless one is already running. ``await load_snapshot()`` returns the snapshot."""
+        if guild.id in self._running:
+            self._again.add(guild.id)
+            return self._running[guild.id]
+
+        task = asyncio.get_running_loop().create_task(self._run(guild, load_snapshot))
+        self._running[guild.id] = task
+        return task
+
+    async def _run(self, guild, load_snapshot):
+        try:
+            while True:
+                self._again.discard(guild.id)
+                snapshot = await load_snapshot()
+                if snapshot:
+                    await self.apply(guild, plan_restore(guild, snapshot))
+                if guild.id not in self._again:
+                    break
+        except Exception as e:
+            logger.error(f"Restore failed for {guild}", exc_info=e)
+        finally:
+            self._running.pop(guild.id, None)
+            self._again.discard(guild.id)
+
+    async def _pool(self, create, items):
+        def failed(item, e):
+            logger.error(f"Failed to restore {item['name']}", exc_info=e)
+
+        return await run_bounded(items, create, self.concurrency, failed)
+
+    async def apply(self, guild: discord.Guild, plan: RestorePlan):
+        if not plan:
+            return
+        logger.warning(f"Restoring {len(plan)} roles/channels in {guild.name}")
+
+        # Old role id -> new role, so channel overwrites can point at recreated roles
+        role_map = {}
+
+        async def create_role(r):
+            role = await guild.create_role(
+                name=r["name"],
+                permissions=discord.Permissions(r["permissions"]),
+                colour=discord.Colour(r.get("colour", r.get("color", 0))),
+                hoist=r["hoist"],
+                mentionable=r["mentionable"],
+                reason="Anti-Nuke restore"
+            )
+            if r.get("id"):
+                role_map[r["id"]] = role
+
+        await self._pool(create_role, plan.roles)
+
+        # Categories first so channels can be placed inside them
+        category_map = {}
+
+        async def create_category(c):
+            category = await guild.create_category(
+                c["name"], overwrites=self._overwrites(guild, c, role_map), reason="Anti-Nuke restore"
+            )
+            if c.get("id"):
+                category_map[c["id"]] = category
+
+        await self._pool(create_category, plan.categories)
+        await self._pool(lambda c: self._create_channel(guild, c, role_map, category_map), plan.channels)
+
+    @staticmethod
+    def _overwrites(guild, c, role_map):
+        overwrites = {}
+        for target_id, pair in c.get("overwrites", {}).items():
+            target_id = int(target_id)
+            target = role_map.get(target_id) or guild.get_role(target_id) or guild.get_member(target_id)
+            if target is not None:
+                overwrites[target] = discord.PermissionOverwrite.from_pair(
+                    discord.Permissions(pair["allow"]), discord.Permissions(pair["deny"])
+                )
+        return overwrites
+
+    async def _create_channel(self, guild, c, role_map, category_map):
+        category = None
+        if c.get("category_id"):
+            category = category_map.get(c["category_id"]) or guild.get_channel(c["category_id"])
+        elif c.get("category"):
+            category = discord.utils.get(guild.categories, name=c["category"])
+
+        kwargs = {"category": category, "overwrites": self._overwrites(guild, c, role_map), "reason": "Anti-Nuke restore"}
+        kind = c["type"]
+        if kind in ("text", "news"):
+            return await guild.create_text_channel(
+                c["name"], topic=c.get("topic"), nsfw=c.get("nsfw", False), slowmode_delay=c.get("slowmode_delay") or 0, **kwargs
+            )
+        if kind == "voice":
+            extra = {k: c[k] for k in ("bitrate", "user_limit") if c.get(k) is not None}
+            return await guild.create_voice_channel(c["name"], **extra, **kwargs)
+        if kind == "stage_voice":
+            return await guild.create_stage_channel(c["name"], **kwargs)
+        if kind == "forum":
+            return await guild.create_forum(c["name"], topic=c.get("topic"), nsfw=c.get("nsfw", False), **kwargs)
+        logger.info(f"Skipping restore of unsupported channel type {kind}: {c['name']}")
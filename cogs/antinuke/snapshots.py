@@ -0,0 +1,264 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime
+
+
+def _atomic_write(path, data: bytes):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _encode(obj):
+    return json.dumps(obj, sort_keys=True, separators=(",", ":")).encode()
+
+
+# ================================
+#      PER-GUILD SNAPSHOT PACK
+# ================================
+
+class GuildSnapshots:
+    """Versioned snapshots of one guild, kept under ``antinuke_data/<guild_id>/``.
+
+    Each role and channel is stored once per distinct content in ``objects.pack``
+    as a zlib-compressed record named by its hash; a version is just the list of
+    ``[id, hash, position]`` entries it references, kept in the compressed
+    ``index.z``. Positions live in the entry rather than the object, so inserting
+    one role doesn't make every role below it a new object. A new version only
+    appends the roles and channels that changed since any kept one.
+    """
+
+    def __init__(self, path, keep):
+        self.path = path
+        self.keep = keep
+        self.pack_path = os.path.join(path, "objects.pack")
+        self.index_path = os.path.join(path, "index.z")
+        self.objects = {}                 # hash -> [offset, length] in objects.pack
+        self.versions = []                # oldest first: {"id", "ts", "roles": [[id, hash, position]], "channels": [...]}
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                index = json.loads(zlib.decompress(f.read()))
+            self.objects = index["objects"]
+            self.versions = index["versions"]
+
+    def _save_index(self):
+        data = _encode({"objects": self.objects, "versions": self.versions})
+        _atomic_write(self.index_path, zlib.compress(data, 6))
+
+    # ---------------- OBJECTS ---------------- #
+
+    def _put(self, pack, item):
+        item = dict(item)
+        position = item.pop("position", None)
+        data = _encode(item)
+        digest = hashlib.blake2b(data, digest_size=12).hexdigest()
+        if digest not in self.objects:
+            blob = zlib.compress(data, 6)
+            self.objects[digest] = [pack.tell(), len(blob)]
+            pack.write(blob)
+        return [item.get("id"), digest, position]
+
+    def _get(self, pack, entry):
+        _, digest, position = entry
+        offset, length = self.objects[digest]
+        pack.seek(offset)
+        item = json.loads(zlib.decompress(pack.read(length)))
+        if position is not None:
+            item["position"] = position
+        return item
+
+    # ---------------- VERSIONS ---------------- #
+
+    def save(self, snapshot):
+        """Store ``snapshot`` as a new version; returns its id, or None if nothing changed."""
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.pack_path, "ab") as pack:
+            roles = [self._put(pack, r) for r in snapshot.get("roles", [])]
+            channels = [self._put(pack, c) for c in snapshot.get("channels", [])]
+            pack.flush()
+            os.fsync(pack.fileno())
+
+        latest = self.versions[-1] if self.versions else None
+        if latest and latest["roles"] == roles and latest["channels"] == channels:
+            return None
+
+        version = {
+            "id": latest["id"] + 1 if latest else 1,
+            "ts": snapshot.get("ts") or datetime.utcnow().isoformat(),
+            "roles": roles,
+            "channels": channels
+        }
+        self.versions.append(version)
+        if len(self.versions) > self.keep:
+            del self.versions[:-self.keep]
+            self._compact()
+        self._save_index()
+        return version["id"]
+
+    def _version(self, version_id=None):
+        if not self.versions:
+            return None
+        if version_id is None:
+            return self.versions[-1]
+        return next((v for v in self.versions if v["id"] == version_id), None)
+
+    def load(self, version_id=None):
+        """Snapshot in the :func:`capture` format, latest version by default."""
+        version = self._version(version_id)
+        if version is None:
+            return None
+
+        with open(self.pack_path, "rb") as pack:
+            return {
+                "version": version["id"],
+                "roles": [self._get(pack, entry) for entry in version["roles"]],
+                "channels": [self._get(pack, entry) for entry in version["channels"]],
+                "ts": version["ts"]
+            }
+
+    def diff(self, old_id, new_id=None):
+        """IDs added, removed, changed and moved between two versions, for roles and channels."""
+        old, new = self._version(old_id), self._version(new_id)
+        if old is None or new is None:
+            return None
+
+        result = {}
+        for kind in ("roles", "channels"):
+            before = {i: (digest, position) for i, digest, position in old[kind]}
+            after = {i: (digest, position) for i, digest, position in new[kind]}
+            both = [i for i in after if i in before]
+            result[kind] = {
+                "added": [i for i in after if i not in before],
+                "removed": [i for i in before if i not in after],
+                "changed": [i for i in both if before[i][0] != after[i][0]],
+                "moved": [i for i in both if before[i][1] != after[i][1]]
+            }
+        return result
+
+    def _compact(self):
+        """Rewrite the pack with only the objects still referenced by a kept version."""
+        live = {entry[1] for v in self.versions for kind in ("roles", "channels") for entry in v[kind]}
+        tmp = f"{self.pack_path}.tmp"
+        objects = {}
+        with open(self.pack_path, "rb") as src, open(tmp, "wb") as dst:
+            for digest in live:
+                offset, length = self.objects[digest]
+                src.seek(offset)
+                objects[digest] = [dst.tell(), length]
+                dst.write(src.read(length))
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp, self.pack_path)
+        self.objects = objects
+
+
+# ================================
+#         SNAPSHOT STORE
+# ================================
+
+class SnapshotStore:
+    """Per-guild :class:`GuildSnapshots`, loaded on first use.
+
+    Methods block on disk I/O, so the cog calls them through ``asyncio.to_thread``;
+    a lock keeps concurrent calls from interleaving pack writes.
+    """
+
+    def __init__(self, root="antinuke_data", keep=10):
+        self.root = root
+        self.keep = keep
+        self._guilds = {}
+        self._lock = threading.Lock()
+
+    def _guild(self, guild_id):
+        guild = self._guilds.get(guild_id)
+        if guild is None:
+            guild = self._guilds[guild_id] = GuildSnapshots(os.path.join(self.root, str(guild_id)), self.keep)
+            if not guild.versions:
+                self._import_legacy(guild_id, guild)
+        return guild
+
+    def _import_legacy(self, guild_id, guild):
+        # antinuke_data/<guild_id>.json holds a single unversioned backup
+        legacy = os.path.join(self.root, f"{guild_id}.json")
+        if not os.path.exists(legacy):
+            return
+        with open(legacy) as f:
+            backup = json.load(f).get("backup")
+        if backup:
+            guild.save(backup)
+
+    def save(self, guild_id, snapshot):
+        with self._lock:
+            return self._guild(guild_id).save(snapshot)
+
+    def load(self, guild_id, version_id=None):
+        with self._lock:
+            return self._guild(guild_id).load(version_id)
+
+    def versions(self, guild_id):
+        """``(id, ts, roles, channels)`` for each kept version, oldest first."""
+        with self._lock:
+            return [
+                (v["id"], v["ts"], len(v["roles"]), len(v["channels"]))
+                for v in self._guild(guild_id).versions
+            ]
+
+    def diff(self, guild_id, old_id, new_id=None):
+        with self._lock:
+            return self._guild(guild_id).diff(old_id, new_id)
+
+
+# ================================
+#      AUTO-SNAPSHOT SCHEDULE
+# ================================
+
+class SnapshotScheduler:
+    """Which guilds need a fresh snapshot, and when it is safe to take one.
+
+    Structure events :meth:`mark` a guild dirty; it becomes :meth:`due` once no
+    event has arrived for ``quiet`` seconds, so a burst of edits produces one
+    snapshot. While a guild is held (an anti-nuke detection is in progress) it is
+    never due, so the attack's damage doesn't become the newest version.
+    """
+
+    def __init__(self, quiet=30.0):
+        self.quiet = quiet
+        self._dirty = {}                  # guild_id -> time of the last change
+        self._held = {}                   # guild_id -> hold expiry
+
+    def __len__(self):
+        return len(self._dirty)
+
+    def mark(self, guild_id, now=None):
+        self._dirty[guild_id] = time.monotonic() if now is None else now
+
+    def hold(self, guild_id, seconds, now=None):
+        now = time.monotonic() if now is None else now
+        self._held[guild_id] = max(self._held.get(guild_id, 0.0), now + seconds)
+
+    def held(self, guild_id, now=None):
+        now = time.monotonic() if now is None else now
+        until = self._held.get(guild_id)
+        if until is not None and until <= now:
+            del self._held[guild_id]
+            until = None
+        return until is not None
+
+    def due(self, now=None):
+        """Pop and return the guilds whose quiet period has passed and that aren't held."""
+        now = time.monotonic() if now is None else now
+        ready = [
+            guild_id for guild_id, changed in self._dirty.items()
+            if now - changed >= self.quiet and not self.held(guild_id, now)
+        ]
+        for guild_id in ready:
+            del self._dirty[guild_id]
+        return ready
@@ -0,0 +1,69 @@
+import time
+from collections import deque
+
+
+class SlidingWindow:
+    """Counts events per key over the last ``window`` seconds.
+
+    Each key keeps a deque of ``(timestamp, value)``; expired ones are popped off
+    the left as new events arrive, so a hit is amortised O(1). ``value`` is an
+    optional payload, such as the member ID of a join, returned by :meth:`recent`. Keys that have gone quiet
+    are dropped by a sweep that runs at most once every ``sweep_interval``
+    seconds, piggybacked on :meth:`hit`.
+    """
+
+    def __init__(self, window, sweep_interval=60):
+        self.window = window
+        self.sweep_interval = sweep_interval
+        self._events = {}                 # key -> deque of (timestamp, value), oldest first
+        self._last_sweep = 0.0
+
+    def __len__(self):
+        return len(self._events)
+
+    def _expire(self, events, now):
+        cutoff = now - self.window
+        while events and events[0][0] < cutoff:
+            events.popleft()
+
+    def hit(self, key, now=None, value=None):
+        """Record an event for ``key`` and return how many fall inside the window."""
+        now = time.monotonic() if now is None else now
+        events = self._events.get(key)
+        if events is None:
+            events = self._events[key] = deque()
+        events.append((now, value))
+        self._expire(events, now)
+
+        if now - self._last_sweep >= self.sweep_interval:
+            self.sweep(now)
+        return len(events)
+
+    def count(self, key, now=None):
+        events = self._events.get(key)
+        if not events:
+            return 0
+        self._expire(events, time.monotonic() if now is None else now)
+        return len(events)
+
+    def recent(self, key, now=None):
+        """Values of the events for ``key`` inside the window, oldest first."""
+        events = self._events.get(key)
+        if not events:
+            return []
+        self._expire(events, time.monotonic() if now is None else now)
+        return [value for _, value in events]
+
+    def reset(self, key):
+        self._events.pop(key, None)
+
+    def sweep(self, now=None):
+        """Drop every key with no events left inside the window; returns how many were dropped."""
+        now = time.monotonic() if now is None else now
+        cutoff = now - self.window
+        # The newest event is on the right, so one comparison tells whether a key is idle
+        idle = [key for key, events in self._events.items() if not events or events[-1][0] < cutoff]
+        for key in idle:
+            del self._events[key]
+        self._last_sweep = now
+        return len(idle)
@@ -0,0 +1,23 @@
+import asyncio
+
+
+async def run_bounded(items, func, concurrency, on_error):
+    """``await func(item)`` for every item, with at most ``concurrency`` calls in flight.
+
+    ``items`` is consumed lazily as workers free up, so a generator over a whole
+    guild is fine. A call that raises is handed to ``on_error(item, exception)``
+    and the rest carry on. Returns the results of the calls that succeeded, in
+    the order they finished.
+    """
+    items = iter(items)
+    results = []
+
+    async def worker():
+        for item in items:
+            try:
+                results.append(await func(item))
+            except Exception as e:
+                on_error(item, e)
+
+    await asyncio.gather(*(worker() for _ in range(max(concurrency, 1))))
+    return results
@@ -0,0 +1,39 @@
+from collections import OrderedDict
+
+
+class CooldownTable:
+    """Per-guild text XP cooldowns that forget users once their cooldown is over.
+
+    Entries are only added when a cooldown starts and are never refreshed while
+    active, so insertion order is expiry order: each call pops the expired entries
+    off the front, which is amortised O(1). ``max_size`` is a hard cap; past it
+    the oldest cooldowns are dropped early.
+    """
+
+    def __init__(self, window, max_size=100000):
+        self.window = window
+        self.max_size = max_size
+        self._started = OrderedDict()     # (guild_id, user_id) -> started_at
+
+    def __len__(self):
+        return len(self._started)
+
+    def _sweep(self, now):
+        started = self._started
+        while started:
+            key, at = next(iter(started.items()))
+            if now - at < self.window:
+                break
+            del started[key]
+
+    def acquire(self, guild_id, user_id, now):
+        """Start a cooldown and return True, or return False if one is still running."""
+        self._sweep(now)
+        key = (guild_id, user_id)
+        if key in self._started:
+            return False
+
+        self._started[key] = now
+        if len(self._started) > self.max_size:
+            self._started.popitem(last=False)
+        return True
@@ -1,31 +1,18 @@
 import discord
 from discord.ext import commands, tasks
-import json
-import os
 import time
-from PIL import Image, ImageDraw, ImageFont
+from functools import partial
 from io import BytesIO
 
 from settings import *
+from cogs.leveling.cooldown import CooldownTable
+from cogs.leveling.store import LevelStore, SqliteLevelStore
+from cogs.leveling.rankcard import RankCardRenderer
+from cogs.leveling.roles import RoleReconciler
+from cogs.leveling.voice import EffectQueue, VoiceSessions, add_xp
 
 LEVELS_FILE = "levels.json"
-
-
-# ---------------- FILE UTILS ---------------- #
-
-def load_levels():
-    if not os.path.exists(LEVELS_FILE):
-        with open(LEVELS_FILE, "w") as f:
-            json.dump({}, f)
-        return {}
-
-    with open(LEVELS_FILE, "r") as f:
-        return json.load(f)
-
-
-def save_levels(data):
-    with open(LEVELS_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+LEVELS_DB = "levels.db"
 
 
 def xp_for_next_level(level):
@@ -39,50 +26,75 @@ def xp_for_next_level(level):
 class Leveling(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.levels = load_levels()
-        self.text_cooldowns = {}
+        if LEVELS_BACKEND == "sqlite":
+            # Imports levels.json into the database the first time it starts empty
+            self.store = SqliteLevelStore(LEVELS_DB, json_path=LEVELS_FILE, flush_threshold=LEVELS_FLUSH_THRESHOLD)
+        else:
+            self.store = LevelStore(LEVELS_FILE, flush_threshold=LEVELS_FLUSH_THRESHOLD)
+        self.renderer = RankCardRenderer(
+            workers=RANK_CARD_WORKERS,
+            avatar_cache_bytes=AVATAR_CACHE_MB * 1024 * 1024,
+            avatar_ttl=AVATAR_CACHE_TTL,
+            card_cache_bytes=RANK_CARD_CACHE_MB * 1024 * 1024
+        )
+        self.effects = EffectQueue(per_second=LEVEL_ROLE_UPDATES_PER_SECOND)
+        self.roles = RoleReconciler(
+            LEVEL_ROLES,
+            remove_old=REMOVE_OLD_LEVEL_ROLES,
+            prestige_role_id=PRESTIGE_ROLE_ID if PRESTIGE_ENABLED else None,
+            debounce=LEVEL_ROLE_DEBOUNCE,
+            concurrency=LEVEL_ROLE_CONCURRENCY
+        )
+        self.sessions = VoiceSessions(VOICE_XP_PER_MINUTE)
+        self.text_cooldowns = CooldownTable(TEXT_XP_COOLDOWN, max_size=TEXT_XP_COOLDOWN_MAX_USERS)
         self.voice_xp.start()
+        self.flush_levels.start()
+
+    async def cog_load(self):
+        self.effects.start()
+        self.seed_voice()
+
+    async def cog_unload(self):
+        self.voice_xp.cancel()
+        self.flush_levels.cancel()
+        # Credit voice time up to now, or everything since the last tick is lost
+        if LEVELING_ENABLED:
+            self.credit_voice(self.sessions.settle(time.time(), self.in_voice))
+        self.effects.stop()
+        self.roles.close()
+        self.renderer.close()
+        await self.store.close()
 
     # ---------------- USER DATA ---------------- #
 
     def get_user(self, guild_id, user_id):
-        self.levels.setdefault(guild_id, {})
-        self.levels[guild_id].setdefault(user_id, {
-            "xp": 0,
-            "level": 0,
-            "prestige": 0
-        })
-        return self.levels[guild_id][user_id]
+        return self.store.get(guild_id, user_id)
+
+    @tasks.loop(seconds=LEVELS_FLUSH_INTERVAL)
+    async def flush_levels(self):
+        await self.store.flush()
 
     # ---------------- ROLES ---------------- #
 
-    async def handle_level_roles(self, member, level):
-        for req_level, role_id in LEVEL_ROLES.items():
-            role = member.guild.get_role(role_id)
-            if not role:
+    def level_role_jobs(self, guild):
+        for member in guild.members:
+            if member.bot:
                 continue
-
-            if level >= req_level and role not in member.roles:
-                await member.add_roles(role)
-
-            if REMOVE_OLD_LEVEL_ROLES and level < req_level and role in member.roles:
-                await member.remove_roles(role)
+            data = self.store.peek(guild.id, member.id)
+            yield (member, data.level, data.prestige) if data else (member, 0, 0)
 
     async def handle_prestige(self, member, data):
+        # The prestige role itself is handed out by the role reconciler
         if not PRESTIGE_ENABLED:
             return
 
-        if data["level"] >= PRESTIGE_LEVEL_REQUIREMENT:
-            data["level"] = 0
-            data["xp"] = 0
-            data["prestige"] += 1
-
-            role = member.guild.get_role(PRESTIGE_ROLE_ID)
-            if role:
-                await member.add_roles(role)
+        if data.level >= PRESTIGE_LEVEL_REQUIREMENT:
+            data.level = 0
+            data.xp = 0
+            data.prestige += 1
 
             try:
-                await member.send(f"🌟 You prestiged! Prestige **{data['prestige']}**")
+                await member.send(f"🌟 You prestiged! Prestige **{data.prestige}**")
             except:
                 pass
 
@@ -93,93 +105,143 @@ class Leveling(commands.Cog):
         if not LEVELING_ENABLED or message.author.bot or not message.guild:
             return
 
-        now = time.time()
-        uid = str(message.author.id)
-        gid = str(message.guild.id)
+        uid = message.author.id
+        gid = message.guild.id
 
-        if now - self.text_cooldowns.get(uid, 0) < TEXT_XP_COOLDOWN:
+        if not self.text_cooldowns.acquire(gid, uid, time.monotonic()):
             return
 
-        self.text_cooldowns[uid] = now
         data = self.get_user(gid, uid)
 
-        data["xp"] += int(TEXT_XP_PER_MESSAGE * LEVEL_XP_MULTIPLIER)
+        data.xp += int(TEXT_XP_PER_MESSAGE * LEVEL_XP_MULTIPLIER)
 
-        needed = xp_for_next_level(data["level"])
-        if data["xp"] >= needed:
-            data["xp"] -= needed
-            data["level"] += 1
+        needed = xp_for_next_level(data.level)
+        levelled = data.xp >= needed
+        if levelled:
+            data.xp -= needed
+            data.level += 1
 
-            await self.handle_level_roles(message.author, data["level"])
-            await self.handle_prestige(message.author, data)
+        # Mark the record dirty before awaiting anything, so a failed DM or send can't lose it
+        self.store.touch(gid, uid)
+        if not levelled:
+            return
 
-            channel = self.bot.get_channel(LEVEL_UP_CHANNEL_ID) if LEVEL_UP_CHANNEL_ID else message.channel
-            await channel.send(LEVEL_UP_MESSAGE.format(member=message.author.mention, level=data["level"]))
+        await self.handle_prestige(message.author, data)
+        self.store.touch(gid, uid)
+        self.roles.schedule(message.author, data.level, data.prestige)
 
-        save_levels(self.levels)
+        channel = self.bot.get_channel(LEVEL_UP_CHANNEL_ID) if LEVEL_UP_CHANNEL_ID else message.channel
+        await channel.send(LEVEL_UP_MESSAGE.format(member=message.author.mention, level=data.level))
 
     # ---------------- VOICE XP ---------------- #
 
+    @staticmethod
+    def earns_voice_xp(state):
+        if state is None or state.channel is None:
+            return False
+        if state.self_mute or state.mute or state.self_deaf or state.deaf:
+            return False
+        return state.channel != state.channel.guild.afk_channel
+
+    def in_voice(self, guild_id, user_id):
+        guild = self.bot.get_guild(guild_id)
+        member = guild.get_member(user_id) if guild else None
+        return member is not None and self.earns_voice_xp(member.voice)
+
+    def seed_voice(self):
+        """Open sessions for members already in voice; existing sessions keep their start time."""
+        now = time.time()
+        for guild in self.bot.guilds:
+            for vc in guild.voice_channels:
+                for member in vc.members:
+                    if not member.bot and self.earns_voice_xp(member.voice):
+                        self.sessions.start(guild.id, member.id, now)
+
+    # A reconnect rebuilds the voice cache without sending voice state updates
+    @commands.Cog.listener()
+    async def on_ready(self):
+        self.seed_voice()
+
+    @commands.Cog.listener()
+    async def on_resumed(self):
+        self.seed_voice()
+
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member, before, after):
+        if not LEVELING_ENABLED or member.bot:
+            return
+
+        was, now = self.earns_voice_xp(before), self.earns_voice_xp(after)
+        if now and not was:
+            self.sessions.start(member.guild.id, member.id, time.time())
+        elif was and not now:
+            xp = self.sessions.stop(member.guild.id, member.id, time.time())
+            self.credit_voice([(member.guild.id, member.id, xp)])
+
     @tasks.loop(seconds=VOICE_XP_CHECK_INTERVAL)
     async def voice_xp(self):
         if not LEVELING_ENABLED:
             return
 
-        for guild in self.bot.guilds:
-            for vc in guild.voice_channels:
-                for member in vc.members:
-                    if member.bot:
-                        continue
+        # Only open sessions are visited, not every voice channel; ones whose member
+        # has left or stopped earning without us hearing about it are dropped
+        self.credit_voice(self.sessions.settle(time.time(), self.in_voice))
+
+    def credit_voice(self, credits):
+        credits = [c for c in credits if c[2] > 0]
+        if not credits:
+            return
 
-                    data = self.get_user(str(guild.id), str(member.id))
-                    data["xp"] += VOICE_XP_PER_MINUTE
+        keys = [(gid, uid) for gid, uid, _ in credits]
+        records = [self.get_user(gid, uid) for gid, uid in keys]
+        levelled = add_xp(records, [xp for _, _, xp in credits], xp_for_next_level)
 
-                    needed = xp_for_next_level(data["level"])
-                    if data["xp"] >= needed:
-                        data["xp"] -= needed
-                        data["level"] += 1
-                        await self.handle_level_roles(member, data["level"])
-                        await self.handle_prestige(member, data)
+        for gid, uid in keys:
+            self.store.touch(gid, uid)
 
-        save_levels(self.levels)
+        # Role and prestige updates hit the API, so they go through the rate-limited queue
+        for i in levelled:
+            guild = self.bot.get_guild(credits[i][0])
+            member = guild.get_member(credits[i][1]) if guild else None
+            if member:
+                self.effects.put(partial(self.voice_level_up, member, keys[i], records[i]))
+
+    async def voice_level_up(self, member, key, data):
+        await self.handle_prestige(member, data)
+        self.roles.schedule(member, data.level, data.prestige)
+        self.store.touch(*key)
 
     # ---------------- COMMANDS ---------------- #
 
     @commands.command()
     async def level(self, ctx, member: discord.Member = None):
         member = member or ctx.author
-        data = self.get_user(str(ctx.guild.id), str(member.id))
+        data = self.get_user(ctx.guild.id, member.id)
 
         embed = discord.Embed(
             title=f"📊 {member.display_name}'s Level",
             color=discord.Color.blurple()
         )
-        embed.add_field(name="Level", value=data["level"])
-        embed.add_field(name="Prestige", value=data["prestige"])
-        embed.add_field(name="XP", value=f"{data['xp']} / {xp_for_next_level(data['level'])}")
+        embed.add_field(name="Level", value=data.level)
+        embed.add_field(name="Prestige", value=data.prestige)
+        embed.add_field(name="XP", value=f"{data.xp} / {xp_for_next_level(data.level)}")
 
         await ctx.send(embed=embed)
 
     @commands.command()
     async def leaderboard(self, ctx):
-        guild_data = self.levels.get(str(ctx.guild.id), {})
-        if not guild_data:
+        top = await self.store.top(ctx.guild.id, 10)
+        if not top:
             return await ctx.send("No data.")
 
-        top = sorted(
-            guild_data.items(),
-            key=lambda x: (x[1]["prestige"], x[1]["level"], x[1]["xp"]),
-            reverse=True
-        )[:10]
-
         embed = discord.Embed(title="🏆 Leaderboard", color=discord.Color.gold())
 
         for i, (uid, data) in enumerate(top, 1):
-            member = ctx.guild.get_member(int(uid))
+            member = ctx.guild.get_member(uid)
             name = member.display_name if member else "Unknown"
             embed.add_field(
                 name=f"{i}. {name}",
-                value=f"⭐ {data['prestige']} | 🔰 {data['level']} | XP {data['xp']}",
+                value=f"⭐ {data.prestige} | 🔰 {data.level} | XP {data.xp}",
                 inline=False
             )
 
@@ -190,72 +252,45 @@ class Leveling(commands.Cog):
     @commands.command()
     async def rank(self, ctx, member: discord.Member = None):
         member = member or ctx.author
-        gid = str(ctx.guild.id)
-        uid = str(member.id)
+        gid = ctx.guild.id
+        uid = member.id
         data = self.get_user(gid, uid)
 
         # Get rank position
-        guild_data = self.levels.get(gid, {})
-        sorted_users = sorted(
-            guild_data.items(),
-            key=lambda x: (x[1]["prestige"], x[1]["level"], x[1]["xp"]),
-            reverse=True
-        )
-        rank_pos = next(i + 1 for i, (u, _) in enumerate(sorted_users) if u == uid)
+        rank_pos = await self.store.position(gid, uid)
 
-        level = data["level"]
-        xp = data["xp"]
-        prestige = data["prestige"]
+        level = data.level
         needed = xp_for_next_level(level)
-        percent = xp / needed
-
-        W, H = 900, 280
-        img = Image.new("RGBA", (W, H), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
-
-        # Neon gradient
-        for y in range(H):
-            r = int(40 + y * 0.4)
-            g = int(20 + y * 0.2)
-            b = int(80 + y * 0.5)
-            draw.line((0, y, W, y), fill=(r, g, b))
-
-        # Glass panel
-        panel = Image.new("RGBA", (860, 240), (20, 20, 25, 220))
-        img.paste(panel, (20, 20), panel)
-
-        # Fonts
-        font_big = ImageFont.truetype("arial.ttf", 38)
-        font_med = ImageFont.truetype("arial.ttf", 26)
-        font_small = ImageFont.truetype("arial.ttf", 18)
-
-        # Avatar
-        avatar_asset = member.display_avatar.with_size(128)
-        avatar_bytes = await avatar_asset.read()
-        avatar = Image.open(BytesIO(avatar_bytes)).convert("RGBA").resize((120, 120))
-
-        #glow = Image.new("RGBA", (140, 140), (20, 20, 25, 220))
-        #img.paste(glow, (50, 70), glow)
-
-        mask = Image.new("L", (120, 120), 0)
-        ImageDraw.Draw(mask).ellipse((0, 0, 120, 120), fill=255)
-        img.paste(avatar, (60, 80), mask)
-
-        # Text
-        draw.text((210, 60), member.display_name, font=font_big, fill="white")
-        draw.text((210, 110), f"LEVEL {level}", font=font_med, fill="#00ffff")
-        draw.text((210, 145), f"Prestige {prestige}", font=font_small, fill="#ffd700")
-        draw.text((210, 170), f"Rank #{rank_pos}", font=font_small, fill="#ff88ff")
-
-        # XP Bar
-        bx, by, bw, bh = 210, 215, 620, 26
-        draw.rectangle((bx, by, bx + bw, by + bh), fill="#1c1f26")
-        draw.rectangle((bx, by, bx + int(bw * percent), by + bh), fill="#00ffe1")
-        draw.text((bx, by - 22), f"{xp:,} / {needed:,} XP", font=font_small, fill="white")
-
-        path = f"rank_{member.id}.png"
-        img.save(path)
-        await ctx.send(file=discord.File(path))
+
+        png = await self.renderer.card(
+            member.display_avatar, member.display_name, level, data.prestige, rank_pos, data.xp, needed
+        )
+        await ctx.send(file=discord.File(BytesIO(png), filename="rank.png"))
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def resynclevelroles(self, ctx):
+        await ctx.send("🔄 Resyncing level roles...")
+        changed = await self.roles.resync(self.level_role_jobs(ctx.guild))
+        await ctx.send(f"✅ Level roles resynced. Updated **{changed}** members.")
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def rankcache(self, ctx):
+        embed = discord.Embed(title="🖼️ Rank Card Cache", color=discord.Color.blurple())
+        for name, cache in (("Cards", self.renderer.cards), ("Avatars", self.renderer.avatars)):
+            stats = cache.stats()
+            embed.add_field(
+                name=name,
+                value=(
+                    f"Entries: {stats['entries']}\n"
+                    f"Memory: {stats['bytes'] / 1024 / 1024:.1f} / {stats['max_bytes'] / 1024 / 1024:.0f} MB\n"
+                    f"Hits: {stats['hits']} | Misses: {stats['misses']} ({stats['hit_ratio']:.0%} hit)\n"
+                    f"Evictions: {stats['evictions']}"
+                ),
+                inline=False
+            )
+        await ctx.send(embed=embed)
 
 
 async def setup(bot):
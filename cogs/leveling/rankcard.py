@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+from cogs.leveling.cache import LRUCache
+
+W, H = 900, 280
+AVATAR_SIZE = 120
+FONT_PATH = "arial.ttf"
+
+
+# ---------------- STATIC LAYERS ---------------- #
+
+def build_background():
+    """Neon gradient + glass panel; identical for every card so it is drawn once."""
+    img = Image.new("RGBA", (W, H), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+
+    for y in range(H):
+        r = int(40 + y * 0.4)
+        g = int(20 + y * 0.2)
+        b = int(80 + y * 0.5)
+        draw.line((0, y, W, y), fill=(r, g, b))
+
+    panel = Image.new("RGBA", (860, 240), (20, 20, 25, 220))
+    img.paste(panel, (20, 20), panel)
+    return img
+
+
+def build_mask():
+    mask = Image.new("L", (AVATAR_SIZE, AVATAR_SIZE), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, AVATAR_SIZE, AVATAR_SIZE), fill=255)
+    return mask
+
+
+# ================================
+#          RENDERER
+# ================================
+
+class RankCardRenderer:
+    """Draws rank cards on a small thread pool and returns them as PNG bytes.
+
+    PIL releases the GIL while compositing and encoding, so a burst of ``.rank``
+    commands no longer stalls the gateway heartbeat. Avatars are kept as
+    ready-to-paste tiles keyed by their CDN hash, so an unchanged avatar is
+    neither downloaded nor decoded again. Finished PNGs are cached by a digest
+    of everything drawn on them, so a repeated ``.rank`` with nothing changed
+    does no PIL work at all.
+    """
+
+    def __init__(self, workers=2, avatar_cache_bytes=32 * 1024 * 1024, avatar_ttl=3600, card_cache_bytes=16 * 1024 * 1024):
+        self.background = build_background()
+        self.mask = build_mask()
+        self.avatars = LRUCache(avatar_cache_bytes, ttl=avatar_ttl)
+        self.cards = LRUCache(card_cache_bytes)
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rank-card")
+
+    def _fonts(self):
+        # FreeType faces are not safe to share between threads, so each worker loads its own once.
+        fonts = getattr(self._local, "fonts", None)
+        if fonts is None:
+            fonts = self._local.fonts = (
+                ImageFont.truetype(FONT_PATH, 38),
+                ImageFont.truetype(FONT_PATH, 26),
+                ImageFont.truetype(FONT_PATH, 18),
+            )
+        return fonts
+
+    # ---------------- AVATARS ---------------- #
+
+    def _avatar_tile(self, avatar_bytes):
+        """Decode, resize and cut the avatar into a circle; the result is pasted as-is."""
+        tile = Image.open(BytesIO(avatar_bytes)).convert("RGBA").resize((AVATAR_SIZE, AVATAR_SIZE))
+        tile.putalpha(ImageChops.multiply(tile.getchannel("A"), self.mask))
+        return tile
+
+    async def avatar(self, asset):
+        """Ready-to-paste tile for a discord ``Asset``.
+
+        The asset key is the avatar hash, which changes whenever the user changes
+        their avatar, so a cache hit never needs revalidating against the CDN.
+        """
+        tile = self.avatars.get(asset.key)
+        if tile is None:
+            avatar_bytes = await asset.with_size(128).read()
+            tile = await asyncio.get_running_loop().run_in_executor(self._executor, self._avatar_tile, avatar_bytes)
+            self.avatars.put(asset.key, tile, AVATAR_SIZE * AVATAR_SIZE * 4)
+        return tile
+
+    # ---------------- DRAWING ---------------- #
+
+    def _draw(self, avatar, name, level, prestige, rank_pos, xp, needed):
+        font_big, font_med, font_small = self._fonts()
+        img = self.background.copy()
+        draw = ImageDraw.Draw(img)
+
+        # Avatar
+        img.paste(avatar, (60, 80), avatar)
+
+        # Text
+        draw.text((210, 60), name, font=font_big, fill="white")
+        draw.text((210, 110), f"LEVEL {level}", font=font_med, fill="#00ffff")
+        draw.text((210, 145), f"Prestige {prestige}", font=font_small, fill="#ffd700")
+        draw.text((210, 170), f"Rank #{rank_pos}", font=font_small, fill="#ff88ff")
+
+        # XP Bar
+        percent = xp / needed
+        bx, by, bw, bh = 210, 215, 620, 26
+        draw.rectangle((bx, by, bx + bw, by + bh), fill="#1c1f26")
+        draw.rectangle((bx, by, bx + int(bw * percent), by + bh), fill="#00ffe1")
+        draw.text((bx, by - 22), f"{xp:,} / {needed:,} XP", font=font_small, fill="white")
+
+        out = BytesIO()
+        img.save(out, format="PNG")
+        return out.getvalue()
+
+    async def render(self, avatar, name, level, prestige, rank_pos, xp, needed):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._draw, avatar, name, level, prestige, rank_pos, xp, needed
+        )
+
+    async def card(self, asset, name, level, prestige, rank_pos, xp, needed):
+        """PNG bytes for a rank card, reused while every drawn value is unchanged."""
+        visible = (asset.key, name, level, prestige, rank_pos, xp, needed)
+        key = hashlib.blake2b(repr(visible).encode(), digest_size=16).digest()
+
+        png = self.cards.get(key)
+        if png is None:
+            avatar = await self.avatar(asset)
+            png = await self.render(avatar, name, level, prestige, rank_pos, xp, needed)
+            self.cards.put(key, png, len(png))
+        return png
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,145 @@
+from array import array
+
+
+# ================================
+#        PER-GUILD RANKING
+# ================================
+
+class GuildRanking:
+    """The rows of one guild's :class:`GuildTable` kept in leaderboard order.
+
+    Entries are row numbers into the table, ordered by ``(-prestige, -level, -xp,
+    user_id)`` so ties are broken by user id. The values a row is currently ranked
+    under are kept in three ``array('q')`` columns, since the table has already
+    changed by the time :meth:`update` has to find the row's old slot. Rows are
+    stored in sorted ``array('q')`` buckets (the layout ``sortedcontainers`` uses)
+    with a Fenwick tree over the bucket sizes, so moving a row and looking up its
+    position are both logarithmic in the guild size, at 32 bytes per user.
+    """
+
+    LOAD = 512
+
+    def __init__(self, table):
+        self.table = table
+        self.xp = array("q", table.xp)    # row -> values the row is ranked under
+        self.level = array("q", table.level)
+        self.prestige = array("q", table.prestige)
+
+        rows = array("q", sorted(range(len(table)), key=self._key))
+        self._buckets = [rows[i:i + self.LOAD] for i in range(0, len(rows), self.LOAD)]
+        self._maxes = array("q", (bucket[-1] for bucket in self._buckets))
+        self._rebuild_index()
+
+    def __len__(self):
+        return len(self.xp)
+
+    def _key(self, row):
+        return -self.prestige[row], -self.level[row], -self.xp[row], self.table.uids[row]
+
+    def _bisect(self, rows, key):
+        """First index in the ordered ``rows`` whose key is not below ``key``."""
+        lo, hi = 0, len(rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(rows[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    # ---------------- FENWICK INDEX ---------------- #
+
+    def _rebuild_index(self):
+        tree = [0] * (len(self._buckets) + 1)
+        for i, bucket in enumerate(self._buckets, 1):
+            tree[i] += len(bucket)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _bump(self, i, delta):
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _count_before(self, i):
+        """Number of entries in buckets ``0..i-1``."""
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    # ---------------- MUTATION ---------------- #
+
+    def _insert(self, row):
+        if not self._buckets:
+            self._buckets.append(array("q", (row,)))
+            self._maxes.append(row)
+            self._rebuild_index()
+            return
+
+        key = self._key(row)
+        i = min(self._bisect(self._maxes, key), len(self._maxes) - 1)
+        bucket = self._buckets[i]
+        bucket.insert(self._bisect(bucket, key), row)
+        self._maxes[i] = bucket[-1]
+
+        if len(bucket) > 2 * self.LOAD:
+            self._buckets[i:i + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+            self._maxes[i:i + 1] = array("q", (self._buckets[i][-1], self._buckets[i + 1][-1]))
+            self._rebuild_index()
+        else:
+            self._bump(i, 1)
+
+    def _delete(self, row):
+        key = self._key(row)
+        i = self._bisect(self._maxes, key)
+        bucket = self._buckets[i]
+        del bucket[self._bisect(bucket, key)]
+
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._bump(i, -1)
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+            self._rebuild_index()
+
+    def update(self, row):
+        """Move ``row`` to the slot for its current prestige/level/xp; rows new to the table join here."""
+        table = self.table
+        while len(self.xp) <= row:
+            new = len(self.xp)
+            self.xp.append(table.xp[new])
+            self.level.append(table.level[new])
+            self.prestige.append(table.prestige[new])
+            self._insert(new)
+
+        if (self.xp[row], self.level[row], self.prestige[row]) == (table.xp[row], table.level[row], table.prestige[row]):
+            return
+        self._delete(row)
+        self.xp[row] = table.xp[row]
+        self.level[row] = table.level[row]
+        self.prestige[row] = table.prestige[row]
+        self._insert(row)
+
+    # ---------------- QUERIES ---------------- #
+
+    def position(self, row):
+        """1-based leaderboard position of ``row``."""
+        key = self._key(row)
+        i = self._bisect(self._maxes, key)
+        return self._count_before(i) + self._bisect(self._buckets[i], key) + 1
+
+    def top(self, limit):
+        """Rows of the first ``limit`` entries, best first."""
+        result = []
+        for bucket in self._buckets:
+            for row in bucket:
+                if len(result) == limit:
+                    return result
+                result.append(row)
+        return result
@@ -0,0 +1,104 @@
+from array import array
+
+
+# ================================
+#        COMPACT GUILD TABLE
+# ================================
+
+class LevelRecord:
+    """View of one row of a :class:`GuildTable`; mutating it writes straight into the columns."""
+
+    __slots__ = ("table", "row")
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    @property
+    def xp(self):
+        return self.table.xp[self.row]
+
+    @xp.setter
+    def xp(self, value):
+        self.table.xp[self.row] = value
+
+    @property
+    def level(self):
+        return self.table.level[self.row]
+
+    @level.setter
+    def level(self, value):
+        self.table.level[self.row] = value
+
+    @property
+    def prestige(self):
+        return self.table.prestige[self.row]
+
+    @prestige.setter
+    def prestige(self, value):
+        self.table.prestige[self.row] = value
+
+
+class GuildTable:
+    """One guild's level data as parallel ``array('q')`` columns.
+
+    A user costs three 8-byte cells plus one int -> row entry in ``index``,
+    instead of a three-key dict with string keys. Rows are never removed.
+    """
+
+    __slots__ = ("index", "uids", "xp", "level", "prestige")
+
+    def __init__(self):
+        self.index = {}                   # user_id -> row
+        self.uids = array("q")
+        self.xp = array("q")
+        self.level = array("q")
+        self.prestige = array("q")
+
+    def __len__(self):
+        return len(self.uids)
+
+    def __contains__(self, user_id):
+        return user_id in self.index
+
+    def get(self, user_id):
+        row = self.index.get(user_id)
+        return None if row is None else LevelRecord(self, row)
+
+    def add(self, user_id, xp=0, level=0, prestige=0):
+        row = self.index.get(user_id)
+        if row is None:
+            row = self.index[user_id] = len(self.uids)
+            self.uids.append(user_id)
+            self.xp.append(xp)
+            self.level.append(level)
+            self.prestige.append(prestige)
+        return LevelRecord(self, row)
+
+    def items(self):
+        for user_id, row in self.index.items():
+            yield user_id, LevelRecord(self, row)
+
+    # ---------------- PERSISTED FORMAT ---------------- #
+
+    @classmethod
+    def from_json(cls, users):
+        table = cls()
+        for uid, data in users.items():
+            table.add(int(uid), data["xp"], data["level"], data["prestige"])
+        return table
+
+    def snapshot(self):
+        """Copies of the columns (a memcpy each), safe to encode on another thread."""
+        return array("q", self.uids), array("q", self.xp), array("q", self.level), array("q", self.prestige)
+
+    @staticmethod
+    def dump(snapshot, f):
+        """Write a :meth:`snapshot` to ``f`` in the levels.json per-guild format, one row at a time."""
+        uids, xp, level, prestige = snapshot
+        f.write("{")
+        f.writelines(
+            f'{"," if i else ""}"{u}":{{"xp":{x},"level":{lv},"prestige":{p}}}'
+            for i, (u, x, lv, p) in enumerate(zip(uids, xp, level, prestige))
+        )
+        f.write("}")
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+
+from cogs.concurrency import run_bounded
+
+logger = logging.getLogger(__name__)
+
+
+# ================================
+#        ROLE RECONCILER
+# ================================
+
+class RoleReconciler:
+    """Brings a member's level and prestige roles in line with their data in one ``Member.edit``.
+
+    :meth:`schedule` waits ``debounce`` seconds before applying, and a burst of
+    requests for the same member collapses into a single edit using the latest
+    level. At most ``concurrency`` edits run at once, bulk resyncs included.
+    """
+
+    def __init__(self, level_roles, remove_old=True, prestige_role_id=None, debounce=2.0, concurrency=4):
+        self.level_roles = level_roles
+        self.remove_old = remove_old
+        self.prestige_role_id = prestige_role_id
+        self.debounce = debounce
+        self.concurrency = concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._pending = {}                # (guild_id, member_id) -> (member, level, prestige)
+        self._tasks = {}
+
+    def target(self, member, level, prestige):
+        """Role list the member should end up with; every role that isn't a level role is kept."""
+        roles = {role for role in member.roles if not role.is_default()}
+        guild = member.guild
+
+        for req_level, role_id in self.level_roles.items():
+            role = guild.get_role(role_id)
+            if not role:
+                continue
+            if level >= req_level:
+                roles.add(role)
+            elif self.remove_old:
+                roles.discard(role)
+
+        if prestige > 0 and self.prestige_role_id:
+            role = guild.get_role(self.prestige_role_id)
+            if role:
+                roles.add(role)
+
+        return roles
+
+    async def apply(self, member, level, prestige):
+        """Edit the member's roles if they differ from the target. Returns True if a request was made."""
+        # The cached member may have been replaced since this was queued
+        member = member.guild.get_member(member.id) or member
+        roles = self.target(member, level, prestige)
+        if roles == {role for role in member.roles if not role.is_default()}:
+            return False
+
+        async with self._semaphore:
+            await member.edit(roles=list(roles), reason="Level roles")
+        return True
+
+    # ---------------- DEBOUNCE ---------------- #
+
+    def schedule(self, member, level, prestige):
+        key = (member.guild.id, member.id)
+        self._pending[key] = (member, level, prestige)
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.get_running_loop().create_task(self._debounced(key))
+
+    async def _debounced(self, key):
+        try:
+            await asyncio.sleep(self.debounce)
+        finally:
+            self._tasks.pop(key, None)
+            member, level, prestige = self._pending.pop(key)
+
+        try:
+            await self.apply(member, level, prestige)
+        except Exception as e:
+            logger.error(f"Failed to update level roles for {member}", exc_info=e)
+
+    # ---------------- BULK ---------------- #
+
+    async def resync(self, jobs):
+        """Apply ``(member, level, prestige)`` jobs with ``concurrency`` workers; returns how many changed."""
+        def failed(job, e):
+            logger.error(f"Failed to resync level roles for {job[0]}", exc_info=e)
+
+        return sum(await run_bounded(jobs, lambda job: self.apply(*job), self.concurrency, failed))
+
+    def close(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
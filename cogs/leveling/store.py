@@ -0,0 +1,329 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from cogs.leveling.ranking import GuildRanking
+from cogs.leveling.records import GuildTable, LevelRecord
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------- FILE UTILS ---------------- #
+
+@contextmanager
+def atomic_file(path):
+    """Text file that replaces ``path`` through a temp file + rename on exit, so a crash never leaves half a file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".levels-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write(path, text):
+    with atomic_file(path) as f:
+        f.write(text)
+
+
+# ================================
+#        WRITE-BEHIND STORE
+# ================================
+
+class BaseLevelStore:
+    """Write-behind bookkeeping shared by the JSON and SQLite backends.
+
+    Callers mutate the record returned by :meth:`get` and then call :meth:`touch`.
+    Touched records are persisted off the event loop by the cog's periodic
+    flush, or early once ``flush_threshold`` updates are pending.
+    """
+
+    def __init__(self, flush_threshold=500):
+        self.flush_threshold = flush_threshold
+        self.dirty = set()                # (guild_id, user_id) touched since the last flush
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="levels-io")
+        self._lock = asyncio.Lock()
+        self._flush_task = None
+
+    def touch(self, guild_id, user_id):
+        """Mark a record as changed; schedules an early flush once enough updates pile up."""
+        self.dirty.add((guild_id, user_id))
+        if len(self.dirty) >= self.flush_threshold and not self._flushing():
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    def _flushing(self):
+        return self._flush_task is not None and not self._flush_task.done()
+
+    async def _run(self, func, *args):
+        """Run blocking IO on the store's single worker thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # ---------------- FLUSHING ---------------- #
+
+    def _snapshot(self, pending):
+        raise NotImplementedError
+
+    def _write(self, payload):
+        raise NotImplementedError
+
+    async def flush(self):
+        async with self._lock:
+            if not self.dirty:
+                return
+            pending, self.dirty = self.dirty, set()
+            try:
+                await self._run(self._write, self._snapshot(pending))
+            except Exception as e:
+                # Put the records back so the next flush retries them.
+                self.dirty |= pending
+                logger.error("Failed to flush levels", exc_info=e)
+
+    async def close(self):
+        """Force a final flush and stop the IO worker."""
+        if self._flushing():
+            await self._flush_task
+        await self.flush()
+        self._executor.shutdown(wait=True)
+
+
+def rank_key(data):
+    return data.prestige, data.level, data.xp
+
+
+class LevelStore(BaseLevelStore):
+    """Every guild held in memory as a :class:`GuildTable` and written back to ``levels.json``.
+
+    Each guild also keeps a :class:`GuildRanking` of row numbers that :meth:`touch`
+    updates, so leaderboard and rank lookups never sort the guild.
+    """
+
+    def __init__(self, path, flush_threshold=500):
+        super().__init__(flush_threshold)
+        self.path = path
+        self.levels = self._load()        # guild_id -> GuildTable
+        self.rankings = {gid: GuildRanking(table) for gid, table in self.levels.items()}
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            atomic_write(self.path, "{}")
+            return {}
+
+        with open(self.path, "r") as f:
+            return {int(gid): GuildTable.from_json(users) for gid, users in json.load(f).items()}
+
+    # ---------------- RECORDS ---------------- #
+
+    def get(self, guild_id, user_id):
+        table = self.levels.get(guild_id)
+        if table is None:
+            table = self.levels[guild_id] = GuildTable()
+            self.rankings[guild_id] = GuildRanking(table)
+
+        data = table.get(user_id)
+        if data is None:
+            data = table.add(user_id)
+            self.rankings[guild_id].update(data.row)
+        return data
+
+    def peek(self, guild_id, user_id):
+        """Like :meth:`get`, but returns None instead of creating a record."""
+        table = self.levels.get(guild_id)
+        return table.get(user_id) if table is not None else None
+
+    def touch(self, guild_id, user_id):
+        self.rankings[guild_id].update(self.levels[guild_id].index[user_id])
+        super().touch(guild_id, user_id)
+
+    async def top(self, guild_id, limit=10):
+        ranking = self.rankings.get(guild_id)
+        if ranking is None:
+            return []
+        table = self.levels[guild_id]
+        return [(table.uids[row], LevelRecord(table, row)) for row in ranking.top(limit)]
+
+    async def position(self, guild_id, user_id):
+        data = self.get(guild_id, user_id)
+        return self.rankings[guild_id].position(data.row)
+
+    # ---------------- FLUSHING ---------------- #
+
+    def _snapshot(self, pending):
+        """Copy every guild's columns (a memcpy each) so the worker thread never sees a table that is growing.
+
+        The whole file is rewritten, so clean guilds are copied too; nothing
+        serialised is kept between flushes.
+        """
+        return {gid: table.snapshot() for gid, table in self.levels.items()}
+
+    def _write(self, snapshots):
+        # Streamed a row at a time, so the file is never built up as one string
+        with atomic_file(self.path) as f:
+            f.write("{")
+            for i, (gid, snapshot) in enumerate(snapshots.items()):
+                f.write(f'{"," if i else ""}"{gid}":')
+                GuildTable.dump(snapshot, f)
+            f.write("}")
+
+
+# ================================
+#          SQLITE STORE
+# ================================
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS levels (
+    guild_id INTEGER NOT NULL,
+    user_id  INTEGER NOT NULL,
+    xp       INTEGER NOT NULL DEFAULT 0,
+    level    INTEGER NOT NULL DEFAULT 0,
+    prestige INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id)
+) WITHOUT ROWID;
+DROP INDEX IF EXISTS levels_rank;
+CREATE INDEX IF NOT EXISTS levels_leaderboard ON levels (guild_id, prestige DESC, level DESC, xp DESC, user_id);
+"""
+
+UPSERT = """
+INSERT INTO levels (guild_id, user_id, xp, level, prestige) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (guild_id, user_id) DO UPDATE SET xp = excluded.xp, level = excluded.level, prestige = excluded.prestige
+"""
+
+
+# Read-only row returned by leaderboard queries
+Level = namedtuple("Level", "xp level prestige")
+
+
+def connect(db_path):
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def migrate_json(json_path, conn):
+    """One-shot import of an existing levels.json into the levels table."""
+    with open(json_path, "r") as f:
+        levels = json.load(f)
+
+    rows = (
+        (int(gid), int(uid), data["xp"], data["level"], data["prestige"])
+        for gid, users in levels.items()
+        for uid, data in users.items()
+    )
+    with conn:
+        conn.executemany(UPSERT, rows)
+    return sum(len(users) for users in levels.values())
+
+
+class SqliteLevelStore(BaseLevelStore):
+    """Level data in SQLite; only users the bot has touched are held in memory, in :class:`GuildTable`\ s.
+
+    Leaderboard and rank lookups are answered from the ``levels_leaderboard`` index
+    instead of sorting the guild. Ties are broken by user id, as in :class:`GuildRanking`.
+    """
+
+    def __init__(self, db_path, json_path=None, flush_threshold=500):
+        super().__init__(flush_threshold)
+        self.conn = connect(db_path)      # used by the worker thread only
+        self.reader = connect(db_path)    # point lookups from the event loop; WAL lets it read during a flush
+        self.cache = {}                   # guild_id -> GuildTable of users loaded so far
+
+        empty = self.conn.execute("SELECT 1 FROM levels LIMIT 1").fetchone() is None
+        if empty and json_path and os.path.exists(json_path):
+            count = migrate_json(json_path, self.conn)
+            logger.info(f"Migrated {count} users from {json_path} to {db_path}")
+
+    # ---------------- RECORDS ---------------- #
+
+    def get(self, guild_id, user_id):
+        table = self.cache.get(guild_id)
+        if table is None:
+            table = self.cache[guild_id] = GuildTable()
+
+        data = table.get(user_id)
+        if data is None:
+            # Primary-key lookup; cheap enough to stay on the loop.
+            row = self.reader.execute(
+                "SELECT xp, level, prestige FROM levels WHERE guild_id = ? AND user_id = ?",
+                (guild_id, user_id)
+            ).fetchone()
+            data = table.add(user_id, *(row or (0, 0, 0)))
+        return data
+
+    def peek(self, guild_id, user_id):
+        """Like :meth:`get`, but returns None instead of creating a record and doesn't cache."""
+        table = self.cache.get(guild_id)
+        data = table.get(user_id) if table is not None else None
+        if data is None:
+            row = self.reader.execute(
+                "SELECT xp, level, prestige FROM levels WHERE guild_id = ? AND user_id = ?",
+                (guild_id, user_id)
+            ).fetchone()
+            data = Level(*row) if row else None
+        return data
+
+    def _top(self, guild_id, limit):
+        rows = self.conn.execute(
+            "SELECT user_id, xp, level, prestige FROM levels WHERE guild_id = ? "
+            "ORDER BY prestige DESC, level DESC, xp DESC, user_id LIMIT ?",
+            (guild_id, limit)
+        ).fetchall()
+        return [(uid, Level(xp, level, prestige)) for uid, xp, level, prestige in rows]
+
+    def _position(self, guild_id, user_id, key):
+        # Two range counts rather than one OR, so both stay on the index
+        (ahead,) = self.conn.execute(
+            "SELECT (SELECT COUNT(*) FROM levels WHERE guild_id = ? AND (prestige, level, xp) > (?, ?, ?)) + "
+            "(SELECT COUNT(*) FROM levels WHERE guild_id = ? AND prestige = ? AND level = ? AND xp = ? AND user_id < ?)",
+            (guild_id, *key, guild_id, *key, user_id)
+        ).fetchone()
+        return ahead + 1
+
+    async def top(self, guild_id, limit=10):
+        await self.flush()
+        return await self._run(self._top, guild_id, limit)
+
+    async def position(self, guild_id, user_id):
+        key = rank_key(self.get(guild_id, user_id))
+        await self.flush()
+        return await self._run(self._position, guild_id, user_id, key)
+
+    # ---------------- FLUSHING ---------------- #
+
+    def _snapshot(self, pending):
+        rows = []
+        for gid, uid in pending:
+            data = self.cache[gid].get(uid)
+            rows.append((gid, uid, data.xp, data.level, data.prestige))
+        return rows
+
+    def _write(self, rows):
+        with self.conn:
+            self.conn.executemany(UPSERT, rows)
+
+    async def close(self):
+        await super().close()
+        self.reader.close()
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python -m cogs.leveling.store levels.json levels.db
+    src, dst = sys.argv[1:3]
+    print(f"Migrated {migrate_json(src, connect(dst))} users")
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------- BATCH XP ---------------- #
+
+def add_xp(records, amounts, needed_for):
+    """Add ``amounts[i]`` XP to ``records[i]`` in one loop, writing straight into each record's table columns.
+
+    Returns the indices of records that gained at least one level.
+    """
+    levelled = []
+    for i, (record, amount) in enumerate(zip(records, amounts)):
+        table, row = record.table, record.row
+        total = table.xp[row] + amount
+        lvl = table.level[row]
+        needed = needed_for(lvl)
+        if total >= needed:
+            while total >= needed:
+                total -= needed
+                lvl += 1
+                needed = needed_for(lvl)
+            table.level[row] = lvl
+            levelled.append(i)
+        table.xp[row] = total
+    return levelled
+
+
+# ================================
+#         VOICE SESSIONS
+# ================================
+
+class VoiceSessions:
+    """When each member currently earning voice XP started earning, per guild.
+
+    Only members in voice are held here, so settling costs time proportional to
+    active voice users rather than to the number of channels. Time is credited
+    to the second; the part of a session too short to earn a whole XP point is
+    carried over to the next settlement.
+    """
+
+    def __init__(self, xp_per_minute):
+        self.seconds_per_xp = 60 / xp_per_minute
+        self.active = {}                  # guild_id -> {user_id: started_at}
+
+    def __len__(self):
+        return sum(len(users) for users in self.active.values())
+
+    def _earned(self, started, now):
+        return int((now - started) / self.seconds_per_xp)
+
+    def start(self, guild_id, user_id, now):
+        self.active.setdefault(guild_id, {}).setdefault(user_id, now)
+
+    def stop(self, guild_id, user_id, now):
+        """End a session and return the XP it earned since the last settlement."""
+        users = self.active.get(guild_id)
+        if users is None or user_id not in users:
+            return 0
+        started = users.pop(user_id)
+        if not users:
+            del self.active[guild_id]
+        return self._earned(started, now)
+
+    def settle(self, now, alive=None):
+        """XP earned so far by every open session, as ``(guild_id, user_id, xp)``.
+
+        Sessions for which ``alive(guild_id, user_id)`` is false are dropped
+        uncredited, in case the leave that should have ended them was never seen.
+        """
+        credits = []
+        for guild_id in list(self.active):
+            users = self.active[guild_id]
+            for user_id, started in list(users.items()):
+                if alive is not None and not alive(guild_id, user_id):
+                    del users[user_id]
+                    continue
+                xp = self._earned(started, now)
+                if xp:
+                    users[user_id] = started + xp * self.seconds_per_xp
+                    credits.append((guild_id, user_id, xp))
+            if not users:
+                del self.active[guild_id]
+        return credits
+
+
+# ================================
+#      RATE-LIMITED SIDE EFFECTS
+# ================================
+
+class EffectQueue:
+    """Runs role/prestige updates one at a time, at most ``per_second`` per second.
+
+    Producers call :meth:`put` with a zero-argument coroutine function and move
+    on; the voice tick never waits for Discord.
+    """
+
+    def __init__(self, per_second=5, maxsize=10000):
+        self.interval = 1 / per_second
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._worker())
+
+    def put(self, job):
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            started = time.monotonic()
+            try:
+                await job()
+            except Exception as e:
+                logger.error("Leveling side effect failed", exc_info=e)
+            finally:
+                self.queue.task_done()
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
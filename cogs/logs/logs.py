@@ -1,17 +1,114 @@
 import discord
-from discord.ext import commands
-from settings import LOG_CHANNEL_ID  # Make sure this exists in your settings file
+from discord.ext import commands, tasks
+from settings import (  # Make sure these exist in your settings file
+    LOG_CHANNEL_ID,
+    LOG_CHANNEL,
+    LOG_CATEGORY_CHANNELS,
+    LOG_ROUTES_FILE,
+    LOG_FLUSH_INTERVAL,
+    LOG_QUEUE_SIZE,
+    LOG_TRANSPORT,
+    MESSAGE_STORE_ENABLED,
+    MESSAGE_STORE_PATH,
+    MESSAGE_STORE_RETENTION_DAYS,
+    MESSAGE_STORE_MAX_MB,
+    MESSAGE_STORE_FLUSH_INTERVAL
+)
 from datetime import datetime
+import logging
+
+from cogs.logs.messages import MessageStore
+from cogs.logs.routing import CATEGORIES, LogRouter
+from cogs.logs.sink import LogSink
+from cogs.logs.transport import WebhookTransport
+
+logger = logging.getLogger(__name__)
+
+# Discord rejects the whole message if any embed goes over these
+DESCRIPTION_LIMIT = 4096
+FIELD_LIMIT = 1024
+
+
+def clip(text, limit):
+    return text if len(text) <= limit else text[:limit - 1] + "…"
 
 class Logs(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.sink = LogSink(self.deliver, flush_interval=LOG_FLUSH_INTERVAL, maxsize=LOG_QUEUE_SIZE)
+        self.webhooks = WebhookTransport(bot) if LOG_TRANSPORT == "webhook" else None
+        self.router = LogRouter(LOG_ROUTES_FILE, LOG_CATEGORY_CHANNELS, LOG_CHANNEL_ID, names={"tickets": LOG_CHANNEL})
+        self.messages = MessageStore(
+            MESSAGE_STORE_PATH, MESSAGE_STORE_RETENTION_DAYS, MESSAGE_STORE_MAX_MB
+        ) if MESSAGE_STORE_ENABLED else None
+
+    async def cog_load(self):
+        if self.webhooks:
+            await self.webhooks.start()
+        if self.messages:
+            self.flush_messages.start()
+            self.prune_messages.start()
+
+    async def cog_unload(self):
+        await self.sink.close()
+        if self.webhooks:
+            await self.webhooks.close()
+        if self.messages:
+            self.flush_messages.cancel()
+            self.prune_messages.cancel()
+            await self.messages.close()
+
+    @tasks.loop(seconds=MESSAGE_STORE_FLUSH_INTERVAL)
+    async def flush_messages(self):
+        await self.messages.flush()
+
+    @tasks.loop(hours=1)
+    async def prune_messages(self):
+        removed = await self.messages.prune()
+        if removed:
+            logger.info(f"Pruned {removed} stored messages")
+
+    def log_message(self, embed: discord.Embed, category: str, guild: discord.Guild):
+        """Queue the log embed for the guild's log channel for ``category``; it is sent with the next batch."""
+        if guild is None:
+            return
+        channel = self.router.resolve(guild, category)
+        if channel is not None:
+            self.sink.put(channel, embed)
+
+    async def deliver(self, channel, embeds):
+        if self.webhooks:
+            await self.webhooks.send(channel, embeds)
+        else:
+            await channel.send(embeds=embeds)
 
-    async def log_message(self, embed: discord.Embed):
-        """Send the log embed to the designated log channel."""
-        channel = self.bot.get_channel(LOG_CHANNEL_ID)
-        if channel:
-            await channel.send(embed=embed)
+    @commands.command(name="logstats")
+    @commands.has_permissions(administrator=True)
+    async def logstats(self, ctx):
+        stats = self.sink.stats()
+        embed = discord.Embed(title="📜 Log Delivery", colour=discord.Colour.blurple())
+        embed.add_field(name="Queued", value=stats["queued"])
+        embed.add_field(name="Sent", value=f"{stats['sent']} embeds in {stats['messages']} messages")
+        embed.add_field(name="Dropped", value=stats["dropped"])
+        await ctx.send(embed=embed)
+
+    @commands.command(name="logroute")
+    @commands.has_permissions(administrator=True)
+    async def logroute(self, ctx, category: str = None, channel: discord.TextChannel = None):
+        """Show routes, or send a category (or "default") to a channel; leave the channel out to clear it."""
+        if category is None:
+            embed = discord.Embed(title="📜 Log Routes", colour=discord.Colour.blurple())
+            for name in CATEGORIES:
+                target = self.router.resolve(ctx.guild, name)
+                embed.add_field(name=name, value=target.mention if target else "Not logged")
+            return await ctx.send(embed=embed)
+
+        category = category.lower()
+        if category not in CATEGORIES and category != "default":
+            return await ctx.send(f"❌ Unknown category. Use one of: default, {', '.join(CATEGORIES)}")
+
+        self.router.set(ctx.guild.id, category, channel.id if channel else None)
+        await ctx.send(f"✅ `{category}` logs now go to {channel.mention}." if channel else f"✅ `{category}` route cleared.")
 
     # -------------------------
     # Command usage
@@ -26,8 +123,8 @@ class Logs(commands.Cog):
         embed.add_field(name="Command", value=ctx.command, inline=False)
         embed.add_field(name="Channel", value=ctx.channel.mention, inline=False)
         if ctx.args:
-            embed.add_field(name="Arguments", value=" ".join(map(str, ctx.args[1:])), inline=False)
-        await self.log_message(embed)
+            embed.add_field(name="Arguments", value=clip(" ".join(map(str, ctx.args[1:])), FIELD_LIMIT), inline=False)
+        self.log_message(embed, "commands", ctx.guild)
 
     # -------------------------
     # Member events
@@ -39,7 +136,7 @@ class Logs(commands.Cog):
             colour=discord.Colour.green(),
             timestamp=datetime.utcnow()
         )
-        await self.log_message(embed)
+        self.log_message(embed, "members", member.guild)
 
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
@@ -49,7 +146,7 @@ class Logs(commands.Cog):
             colour=discord.Colour.red(),
             timestamp=datetime.utcnow()
         )
-        await self.log_message(embed)
+        self.log_message(embed, "members", member.guild)
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
@@ -60,37 +157,73 @@ class Logs(commands.Cog):
                 colour=discord.Colour.orange(),
                 timestamp=datetime.utcnow()
             )
-            embed.add_field(name="Before", value=", ".join([r.name for r in before.roles[1:]]) or "None", inline=False)
-            embed.add_field(name="After", value=", ".join([r.name for r in after.roles[1:]]) or "None", inline=False)
-            await self.log_message(embed)
+            embed.add_field(name="Before", value=clip(", ".join([r.name for r in before.roles[1:]]), FIELD_LIMIT) or "None", inline=False)
+            embed.add_field(name="After", value=clip(", ".join([r.name for r in after.roles[1:]]), FIELD_LIMIT) or "None", inline=False)
+            self.log_message(embed, "members", after.guild)
 
     # -------------------------
     # Message events
     @commands.Cog.listener()
-    async def on_message_delete(self, message: discord.Message):
-        if message.author.bot:
+    async def on_message(self, message: discord.Message):
+        if self.messages and message.guild and not message.author.bot:
+            self.messages.add(message)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        message = payload.cached_message
+        if message is not None:
+            if message.author.bot:
+                return
+            author, content = message.author.mention, message.content
+        elif self.messages:
+            # Older than discord.py's message cache; recover it from the message store
+            stored = await self.messages.get(payload.message_id)
+            if stored is None:
+                return
+            author, content = f"<@{stored.author_id}>", stored.content
+        else:
             return
+
+        if self.messages:
+            await self.messages.forget(payload.message_id)
         embed = discord.Embed(
             title="🗑️ Message Deleted",
-            description=f"Author: {message.author.mention}\nChannel: {message.channel.mention}\nContent: {message.content or 'Empty'}",
+            description=clip(f"Author: {author}\nChannel: <#{payload.channel_id}>\nContent: {content or 'Empty'}", DESCRIPTION_LIMIT),
             colour=discord.Colour.dark_grey(),
             timestamp=datetime.utcnow()
         )
-        await self.log_message(embed)
+        self.log_message(embed, "messages", self.bot.get_guild(payload.guild_id) if payload.guild_id else None)
 
     @commands.Cog.listener()
-    async def on_message_edit(self, before: discord.Message, after: discord.Message):
-        if before.author.bot or before.content == after.content:
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        after = payload.message
+        if after.guild is None or after.author.bot:
             return
+
+        if payload.cached_message is not None:
+            before = payload.cached_message.content
+        elif self.messages:
+            stored = await self.messages.get(payload.message_id)
+            before = stored.content if stored else None
+        else:
+            before = None
+
+        if self.messages and before != after.content:
+            self.messages.add(after)
+        # Embeds loading in, pins and flag changes also arrive as edits. Only log real
+        # content changes, which can't be told apart when the old content is unknown.
+        if before is None or before == after.content:
+            return
+
         embed = discord.Embed(
             title="✏️ Message Edited",
-            description=f"Author: {before.author.mention}\nChannel: {before.channel.mention}",
+            description=f"Author: {after.author.mention}\nChannel: {after.channel.mention}",
             colour=discord.Colour.orange(),
             timestamp=datetime.utcnow()
         )
-        embed.add_field(name="Before", value=before.content or "Empty", inline=False)
-        embed.add_field(name="After", value=after.content or "Empty", inline=False)
-        await self.log_message(embed)
+        embed.add_field(name="Before", value=clip(before, FIELD_LIMIT) or "Empty", inline=False)
+        embed.add_field(name="After", value=clip(after.content, FIELD_LIMIT) or "Empty", inline=False)
+        self.log_message(embed, "messages", after.guild)
 
     # -------------------------
     # Role events
@@ -102,7 +235,7 @@ class Logs(commands.Cog):
             colour=discord.Colour.green(),
             timestamp=datetime.utcnow()
         )
-        await self.log_message(embed)
+        self.log_message(embed, "roles", role.guild)
 
     @commands.Cog.listener()
     async def on_guild_role_delete(self, role: discord.Role):
@@ -112,7 +245,7 @@ class Logs(commands.Cog):
             colour=discord.Colour.red(),
             timestamp=datetime.utcnow()
         )
-        await self.log_message(embed)
+        self.log_message(embed, "roles", role.guild)
 
     @commands.Cog.listener()
     async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
@@ -124,32 +257,38 @@ class Logs(commands.Cog):
         )
         embed.add_field(name="Before", value=f"Name: {before.name}\nColor: {before.color}", inline=False)
         embed.add_field(name="After", value=f"Name: {after.name}\nColor: {after.color}", inline=False)
-        await self.log_message(embed)
+        self.log_message(embed, "roles", after.guild)
 
     # -------------------------
     # Channel events
     @commands.Cog.listener()
     async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        # Cached log routes for the guild may point at (or be missing) this channel
+        self.router.invalidate(channel.guild.id)
         embed = discord.Embed(
             title="➕ Channel Created",
             description=f"Channel: {channel.mention}",
             colour=discord.Colour.green(),
             timestamp=datetime.utcnow()
         )
-        await self.log_message(embed)
+        self.log_message(embed, "channels", channel.guild)
 
     @commands.Cog.listener()
     async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        # Cached log routes for the guild may point at (or be missing) this channel
+        self.router.invalidate(channel.guild.id)
         embed = discord.Embed(
             title="➖ Channel Deleted",
             description=f"Channel: {channel.name}",
             colour=discord.Colour.red(),
             timestamp=datetime.utcnow()
         )
-        await self.log_message(embed)
+        self.log_message(embed, "channels", channel.guild)
 
     @commands.Cog.listener()
     async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        # Cached log routes for the guild may point at (or be missing) this channel
+        self.router.invalidate(after.guild.id)
         embed = discord.Embed(
             title="🔧 Channel Updated",
             description=f"Channel: {before.name}",
@@ -158,7 +297,7 @@ class Logs(commands.Cog):
         )
         embed.add_field(name="Before", value=f"Name: {before.name}", inline=False)
         embed.add_field(name="After", value=f"Name: {after.name}", inline=False)
-        await self.log_message(embed)
+        self.log_message(embed, "channels", after.guild)
 
     # -------------------------
     # Ban events
@@ -170,7 +309,7 @@ class Logs(commands.Cog):
             colour=discord.Colour.red(),
             timestamp=datetime.utcnow()
         )
-        await self.log_message(embed)
+        self.log_message(embed, "moderation", guild)
 
     @commands.Cog.listener()
     async def on_member_unban(self, guild: discord.Guild, user: discord.User):
@@ -180,7 +319,11 @@ class Logs(commands.Cog):
             colour=discord.Colour.green(),
             timestamp=datetime.utcnow()
         )
-        await self.log_message(embed)
+        self.log_message(embed, "moderation", guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.router.invalidate(guild.id)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Logs(bot))
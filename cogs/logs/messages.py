@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import sqlite3
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id         INTEGER PRIMARY KEY,
+    guild_id   INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    author_id  INTEGER NOT NULL,
+    created    INTEGER NOT NULL,
+    content    BLOB NOT NULL,
+    compressed INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_created ON messages (created);
+"""
+
+UPSERT = """
+INSERT INTO messages (id, guild_id, channel_id, author_id, created, content, compressed)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET content = excluded.content, compressed = excluded.compressed
+"""
+
+StoredMessage = namedtuple("StoredMessage", "id guild_id channel_id author_id created content")
+
+
+def encode(content):
+    """UTF-8 bytes, zlib-compressed when that actually saves space; returns ``(blob, compressed)``."""
+    raw = content.encode()
+    if len(raw) > 64:
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            return packed, 1
+    return raw, 0
+
+
+def decode(blob, compressed):
+    return (zlib.decompress(blob) if compressed else bytes(blob)).decode()
+
+
+class MessageStore:
+    """On-disk copy of recent message content, so deletes and edits can be logged after discord.py's cache forgets them.
+
+    :meth:`add` only touches an in-memory buffer; :meth:`flush` writes the buffer
+    in one transaction on a dedicated thread. Lookups check the buffer first, so a
+    message deleted before its flush is still found. Rows older than
+    ``retention_days`` are pruned, and the oldest rows go first when the database
+    outgrows ``max_mb``.
+    """
+
+    def __init__(self, path, retention_days=14, max_mb=256):
+        self.path = path
+        self.retention = retention_days * 86400
+        self.max_bytes = max_mb * 1024 * 1024
+        self.buffer = {}                  # message_id -> StoredMessage awaiting flush
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="messages-io")
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # ---------------- INGEST ---------------- #
+
+    def add(self, message):
+        """Buffer a new message, or the new content of an edited one. Compression waits for the flush."""
+        self.buffer[message.id] = StoredMessage(
+            message.id, message.guild.id, message.channel.id, message.author.id,
+            int(message.created_at.timestamp()), message.content
+        )
+
+    def _write(self, rows):
+        with self.conn:
+            self.conn.executemany(UPSERT, (row[:5] + encode(row.content) for row in rows))
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        rows, self.buffer = list(self.buffer.values()), {}
+        try:
+            await self._run(self._write, rows)
+        except Exception as e:
+            logger.error(f"Failed to store {len(rows)} messages", exc_info=e)
+
+    # ---------------- LOOKUP ---------------- #
+
+    def _get(self, message_id):
+        return self.conn.execute(
+            "SELECT id, guild_id, channel_id, author_id, created, content, compressed FROM messages WHERE id = ?",
+            (message_id,)
+        ).fetchone()
+
+    async def get(self, message_id):
+        buffered = self.buffer.get(message_id)
+        if buffered is not None:
+            return buffered
+        row = await self._run(self._get, message_id)
+        if row is None:
+            return None
+        return StoredMessage(*row[:5], decode(row[5], row[6]))
+
+    def _delete(self, message_ids):
+        with self.conn:
+            self.conn.executemany("DELETE FROM messages WHERE id = ?", [(i,) for i in message_ids])
+
+    async def forget(self, *message_ids):
+        for message_id in message_ids:
+            self.buffer.pop(message_id, None)
+        await self._run(self._delete, message_ids)
+
+    # ---------------- RETENTION ---------------- #
+
+    def _prune(self):
+        removed = self.conn.execute("DELETE FROM messages WHERE created < ?", (int(time.time() - self.retention),)).rowcount
+        self.conn.commit()
+
+        # Drop the oldest tenth (snowflake IDs sort by time) until it fits again; freed pages are reused by new rows
+        while self._size() > self.max_bytes:
+            cut = self.conn.execute(
+                "SELECT id FROM messages ORDER BY id LIMIT 1 OFFSET (SELECT COUNT(*) / 10 FROM messages)"
+            ).fetchone()
+            if cut is None:
+                break
+            removed += self.conn.execute("DELETE FROM messages WHERE id <= ?", cut).rowcount
+            self.conn.commit()
+        return removed
+
+    def _size(self):
+        pages = self.conn.execute("PRAGMA page_count").fetchone()[0]
+        free = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (pages - free) * self.conn.execute("PRAGMA page_size").fetchone()[0]
+
+    async def prune(self):
+        return await self._run(self._prune)
+
+    async def close(self):
+        await self.flush()
+        await self._run(self.conn.close)
+        self._executor.shutdown(wait=True)
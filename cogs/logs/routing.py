@@ -0,0 +1,77 @@
+import json
+import os
+
+CATEGORIES = ("messages", "members", "roles", "channels", "moderation", "commands", "tickets")
+
+
+class LogRouter:
+    """Which channel each guild's logs go to, per category.
+
+    A route is looked up in this order: the guild's route for the category, a
+    channel with the category's fallback name (e.g. the ticket log channel), the
+    guild's ``default`` route, then the global channel for the category or the
+    global log channel, if that channel is in this guild. The answer, including
+    "nowhere", is cached per guild, so an event costs one dict lookup; the cache
+    for a guild is dropped whenever one of its channels is created, renamed or
+    deleted, or its routes change.
+    """
+
+    def __init__(self, path, global_channels, global_default, names=None):
+        self.path = path
+        self.global_channels = global_channels     # category -> channel id or None
+        self.global_default = global_default
+        self.names = names or {}                   # category -> fallback channel name
+        self.routes = {}                           # guild_id -> {category | "default": channel_id}
+        self._cache = {}                           # guild_id -> {category: channel or None}
+
+        if os.path.exists(path):
+            with open(path) as f:
+                self.routes = {int(g): routes for g, routes in json.load(f).items()}
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({str(g): routes for g, routes in self.routes.items()}, f, indent=4)
+        os.replace(tmp, self.path)
+
+    # ---------------- LOOKUP ---------------- #
+
+    def resolve(self, guild, category):
+        """The channel ``guild``'s ``category`` logs go to, or None."""
+        cached = self._cache.get(guild.id)
+        if cached is None:
+            cached = self._cache[guild.id] = {}
+        elif category in cached:
+            return cached[category]
+
+        channel = self._lookup(guild, category)
+        cached[category] = channel
+        return channel
+
+    def _lookup(self, guild, category):
+        routes = self.routes.get(guild.id, {})
+        channel = guild.get_channel(routes.get(category) or 0)
+        if channel is None and category in self.names:
+            channel = next((c for c in guild.text_channels if c.name == self.names[category]), None)
+        if channel is None:
+            channel = guild.get_channel(routes.get("default") or 0)
+        if channel is None:
+            channel = guild.get_channel(self.global_channels.get(category) or self.global_default or 0)
+        return channel
+
+    def invalidate(self, guild_id):
+        self._cache.pop(guild_id, None)
+
+    # ---------------- ROUTES ---------------- #
+
+    def set(self, guild_id, category, channel_id):
+        """Route ``category`` (or ``"default"``) to ``channel_id``; None removes the route."""
+        routes = self.routes.setdefault(guild_id, {})
+        if channel_id is None:
+            routes.pop(category, None)
+            if not routes:
+                del self.routes[guild_id]
+        else:
+            routes[category] = channel_id
+        self.invalidate(guild_id)
+        self.save()
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+MAX_EMBEDS = 10                           # per message
+MAX_EMBED_CHARS = 6000                    # across all embeds of one message
+
+
+def pack(embeds):
+    """Split ``embeds`` into message-sized groups, respecting both Discord limits."""
+    group, size = [], 0
+    for embed in embeds:
+        length = len(embed)
+        if group and (len(group) == MAX_EMBEDS or size + length > MAX_EMBED_CHARS):
+            yield group
+            group, size = [], 0
+        group.append(embed)
+        size += length
+    if group:
+        yield group
+
+
+class LogSink:
+    """Log embeds gathered per destination and sent in batches.
+
+    Listeners call :meth:`put` and return at once. Each destination has its own
+    lane: the first record starts a task that waits ``flush_interval`` seconds so
+    others can pile up, then sends everything queued for that destination, up to
+    10 embeds per message. A batch Discord rejects as malformed is resent one
+    embed at a time, so only the bad record is lost. Lanes run independently, so
+    a flood of message logs never holds up moderation logs going elsewhere. Once
+    ``maxsize`` records are waiting across all lanes, new ones are dropped and
+    counted.
+    """
+
+    def __init__(self, send, flush_interval=2.0, maxsize=5000):
+        self.send = send                  # async (destination, embeds) -> None
+        self.flush_interval = flush_interval
+        self.maxsize = maxsize
+        self.pending = 0
+        self.dropped = 0
+        self.sent = 0
+        self.messages = 0
+        self._lanes = {}                  # destination -> list of embeds waiting
+        self._tasks = {}                  # destination -> lane task
+
+    def put(self, destination, embed):
+        if self.pending >= self.maxsize:
+            self.dropped += 1
+            return
+        self.pending += 1
+        self._lanes.setdefault(destination, []).append(embed)
+        if destination not in self._tasks:
+            self._tasks[destination] = asyncio.get_running_loop().create_task(self._lane(destination))
+
+    async def _deliver(self, destination, group):
+        try:
+            await self.send(destination, group)
+            self.sent += len(group)
+            self.messages += 1
+            return
+        except discord.HTTPException as e:
+            if e.status != 400 or len(group) == 1:
+                logger.error(f"Failed to deliver {len(group)} log embeds to {destination}", exc_info=e)
+                return
+        except Exception as e:
+            logger.error(f"Failed to deliver {len(group)} log embeds to {destination}", exc_info=e)
+            return
+
+        # One malformed embed rejects the whole message; send them singly so only that one is lost
+        for embed in group:
+            await self._deliver(destination, [embed])
+
+    async def _flush(self, destination, embeds):
+        for group in pack(embeds):
+            try:
+                await self._deliver(destination, group)
+            finally:
+                self.pending -= len(group)
+
+    async def _lane(self, destination):
+        try:
+            while self._lanes.get(destination):
+                await asyncio.sleep(self.flush_interval)
+                await self._flush(destination, self._lanes.pop(destination))
+        finally:
+            del self._tasks[destination]
+
+    async def close(self):
+        """Stop every lane and send whatever is still waiting."""
+        for task in list(self._tasks.values()):
+            task.cancel()
+        lanes, self._lanes = self._lanes, {}
+        await asyncio.gather(*(self._flush(destination, embeds) for destination, embeds in lanes.items()))
+
+    def stats(self):
+        return {
+            "queued": self.pending,
+            "sent": self.sent,
+            "messages": self.messages,
+            "dropped": self.dropped,
+        }
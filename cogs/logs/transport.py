@@ -0,0 +1,64 @@
+import logging
+
+import aiohttp
+import discord
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_NAME = "Grate Logs"
+
+
+class WebhookTransport:
+    """Posts log batches through one webhook per log channel instead of the bot's own send route.
+
+    Webhooks have their own rate limits, so log traffic stops competing with
+    everything else the bot says in those channels. A channel's webhook is looked
+    up (or created) once and cached; all webhooks post through one shared aiohttp
+    session. If a webhook can't be used the batch goes out as a normal message.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.session = None
+        self._webhooks = {}               # channel_id -> discord.Webhook bound to the shared session
+        self._denied = set()              # channels where webhooks can't be managed; don't ask again
+
+    async def start(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+        self._webhooks.clear()
+        self._denied.clear()
+
+    async def webhook(self, channel: discord.TextChannel):
+        cached = self._webhooks.get(channel.id)
+        if cached is not None:
+            return cached
+
+        hook = discord.utils.get(await channel.webhooks(), name=WEBHOOK_NAME, user=self.bot.user)
+        if hook is None:
+            hook = await channel.create_webhook(name=WEBHOOK_NAME, reason="Log delivery")
+
+        cached = self._webhooks[channel.id] = discord.Webhook.from_url(hook.url, session=self.session, client=self.bot)
+        return cached
+
+    async def send(self, channel: discord.TextChannel, embeds):
+        if channel.id in self._denied:
+            return await channel.send(embeds=embeds)
+        try:
+            hook = await self.webhook(channel)
+        except discord.HTTPException as e:
+            logger.warning(f"No log webhook for #{channel} ({e}); sending as the bot")
+            self._denied.add(channel.id)
+            return await channel.send(embeds=embeds)
+
+        try:
+            await hook.send(embeds=embeds, username=self.bot.user.name, avatar_url=self.bot.user.display_avatar.url)
+        except discord.NotFound:
+            # Deleted from the channel settings; make a new one next time
+            self._webhooks.pop(channel.id, None)
+            await channel.send(embeds=embeds)
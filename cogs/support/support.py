@@ -97,7 +97,11 @@ class TicketSystem(commands.Cog):
         with open(filename,"w",encoding="utf8") as f:
             f.write(html)
 
-        log = discord.utils.get(channel.guild.text_channels,name=settings.LOG_CHANNEL)
+        logs = self.bot.get_cog("Logs")
+        if logs:
+            log = logs.router.resolve(channel.guild,"tickets")
+        else:
+            log = discord.utils.get(channel.guild.text_channels,name=settings.LOG_CHANNEL)
         if log:
             await log.send(file=discord.File(filename))
 
@@ -8,6 +8,27 @@ dotenv.load_dotenv()
 #---------------------#Logs#---------------------#
 
 LOG_CHANNEL_ID = 1350069823916343365  # Replace with your desired channel ID
+LOG_FLUSH_INTERVAL = 2  # seconds log events are gathered before being sent, up to 10 per message
+LOG_QUEUE_SIZE = 5000  # log events waiting to be sent; beyond this new ones are dropped and counted
+LOG_ROUTES_FILE = "log_routes.json"  # per-server log channels set with .logroute
+LOG_CHANNEL = "ticket-logs"  # channel name ticket transcripts go to when no route is set
+LOG_TRANSPORT = "channel"  # "channel" sends as the bot, "webhook" posts through a webhook per log channel
+# Message content kept on disk so deletes/edits of older messages can still be logged
+MESSAGE_STORE_ENABLED = True
+MESSAGE_STORE_PATH = "messages.db"
+MESSAGE_STORE_RETENTION_DAYS = 14
+MESSAGE_STORE_MAX_MB = 256
+MESSAGE_STORE_FLUSH_INTERVAL = 5  # seconds new messages are buffered before being written
+# Optional separate channel per log category; None uses LOG_CHANNEL_ID
+LOG_CATEGORY_CHANNELS = {
+    "messages": None,
+    "members": None,
+    "roles": None,
+    "channels": None,
+    "moderation": None,
+    "commands": None,
+    "tickets": None,
+}
 
 #---------------------#General#---------------------#
 
@@ -45,7 +66,11 @@ ANTI_NUKE_LIMITS = {
     "channel_create": 3,
     "role_delete": 2,
     "role_create": 3,
-    "guild_update": 2
+    "guild_update": 2,
+    "webhook_create": 3,
+    "member_ban": 3,
+    "member_kick": 3,
+    "bot_add": 2
 }
 
 TIME_WINDOW = 10  # seconds
@@ -57,9 +82,16 @@ TIMEOUT_MINUTES = 60
 # Panic mode
 PANIC_ROLE_NAME = "LOCKED"
 PANIC_CHANNEL_NAME = "server-locked"
+PANIC_CONCURRENCY = 8  # channels locked/unlocked at once; 429s are waited out per channel
 
-# Backup file
-BACKUP_FILE = "server_backup.json"
+# Backups
+BACKUP_FILE = "server_backup.json"  # legacy global backup, only read when a server has no snapshots
+SNAPSHOT_DIR = "antinuke_data"  # per-server versioned snapshots live in SNAPSHOT_DIR/<guild_id>/
+SNAPSHOT_KEEP = 10  # versions kept per server
+AUTO_SNAPSHOT_ENABLED = True  # snapshot automatically after roles/channels change
+SNAPSHOT_QUIET_PERIOD = 30  # seconds without changes before an auto-snapshot is taken
+SNAPSHOT_NUKE_HOLD = 600  # seconds auto-snapshots stay paused after an anti-nuke trigger
+RESTORE_CONCURRENCY = 3  # roles/channels recreated at once during a restore
 
 #---------------------#Verification#---------------------#
 
@@ -80,12 +112,19 @@ VERIFICATION_MESSAGE_DESCRIPTION = (
 ANTI_ALT_ENABLED = True
 ANTI_ALT_MIN_ACCOUNT_AGE = 7  # in days, e.g., accounts younger than this are considered alt accounts
 ANTI_ALT_ACTION = "kick"      # "kick" or "ban"
+ANTI_ALT_CLUSTER_SIZE = 5     # accounts with similar names, created together, joining together before acting
+ANTI_ALT_CLUSTER_ACTION = "log"  # "log" only, or "kick" / "ban" the whole cluster
+ANTI_ALT_CLUSTER_WINDOW = 300 # seconds a join counts towards a cluster
 
 ANTI_RAID_ENABLED = True
 ANTI_RAID_MAX_JOIN_RATE = 5   # max members joining per X seconds
 ANTI_RAID_TIME_FRAME = 10     # timeframe in seconds to check for multiple joins
+ANTI_RAID_CONCURRENCY = 5     # kicks/bans sent at once during a raid (bans go in bulk when possible)
+ANTI_RAID_MODE_MIN_DURATION = 60  # seconds raid mode stays on once triggered
+ANTI_RAID_COOLDOWN_RATE = 2   # raid mode ends when joins per timeframe fall to this or below
 RAID_ACTION = "kick"           # action to take on detected raid
 ADMIN_ROLE_IDS = [123456789012345678]  # roles that bypass anti-raid checks
+ADMIN_IDS = []  # users that bypass anti-alt/raid checks
 
 #---------------------#RSS#---------------------#
 
@@ -102,12 +141,24 @@ LEVELING_ENABLED = True
 
 TEXT_XP_PER_MESSAGE = 10
 TEXT_XP_COOLDOWN = 60  # seconds
+TEXT_XP_COOLDOWN_MAX_USERS = 100000  # most cooldowns remembered at once; oldest are dropped past this
 
 VOICE_XP_PER_MINUTE = 5
-VOICE_XP_CHECK_INTERVAL = 60  # seconds
+VOICE_XP_CHECK_INTERVAL = 60  # seconds between crediting XP to members still in voice (leaving credits immediately)
+LEVEL_ROLE_UPDATES_PER_SECOND = 5  # voice level-up role/prestige updates are queued at this rate
 
 LEVEL_XP_MULTIPLIER = 1.0
 
+# levels.json is written in the background instead of after every message
+LEVELS_FLUSH_INTERVAL = 30     # seconds between background saves
+LEVELS_FLUSH_THRESHOLD = 500   # save early once this many users have pending changes
+LEVELS_BACKEND = "json"        # "json" (levels.json) | "sqlite" (levels.db, imports levels.json on first run)
+
+RANK_CARD_WORKERS = 2  # threads drawing .rank cards
+AVATAR_CACHE_MB = 32   # memory for resized avatars on rank cards
+AVATAR_CACHE_TTL = 3600  # seconds before a cached avatar is fetched again
+RANK_CARD_CACHE_MB = 16  # memory for finished cards, reused while nothing on them changed
+
 LEVEL_UP_MESSAGE = "🎉 {member} reached **Level {level}**!"
 LEVEL_UP_CHANNEL_ID = None  # None = same channel
 
@@ -120,6 +171,8 @@ LEVEL_ROLES = {
 }
 
 REMOVE_OLD_LEVEL_ROLES = True
+LEVEL_ROLE_DEBOUNCE = 2      # seconds to wait so several level-ups become one role edit
+LEVEL_ROLE_CONCURRENCY = 4   # role edits in flight at once (also used by .resynclevelroles)
 
 #----------PRESTIGE----------#
 
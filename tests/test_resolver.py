@@ -0,0 +1,67 @@
+"""Run from the repository root:  python -m unittest discover tests"""
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from cogs.antinuke.resolver import ExecutorResolver
+
+GUILD_UPDATE = "guild_update"
+ADMIN, ATTACKER = 1, 2
+
+
+class StubGuild:
+    """A guild whose audit log is a list of entries, newest first."""
+
+    def __init__(self, id=10):
+        self.id = id
+        self.entries = []
+
+    def log(self, user_id, seconds_ago):
+        entry = SimpleNamespace(
+            guild=self, action=GUILD_UPDATE, target=self, user_id=user_id,
+            created_at=datetime.now(timezone.utc) - timedelta(seconds=seconds_ago)
+        )
+        self.entries.append(entry)
+        self.entries.sort(key=lambda e: e.created_at, reverse=True)
+        return entry
+
+    async def audit_logs(self, limit, action):
+        for entry in [e for e in self.entries if e.action == action][:limit]:
+            yield entry
+
+
+class RepeatedTargetTest(unittest.IsolatedAsyncioTestCase):
+    """guild_update always targets the guild: an earlier editor must never be blamed for a new edit."""
+
+    async def test_fetch_returns_newest_executor(self):
+        guild = StubGuild()
+        guild.log(ADMIN, seconds_ago=20)
+        guild.log(ATTACKER, seconds_ago=0)
+
+        resolver = ExecutorResolver(wait=0)
+        since = datetime.now(timezone.utc)
+        self.assertEqual(await resolver.resolve(guild, GUILD_UPDATE, guild.id, since), ATTACKER)
+
+    async def test_cached_older_entry_is_not_reused(self):
+        guild = StubGuild()
+        resolver = ExecutorResolver(wait=0.5)
+        resolver.record(guild.log(ADMIN, seconds_ago=20))
+
+        # The attacker's edit reaches the audit log after the gateway event
+        since = datetime.now(timezone.utc)
+        attacker = guild.log(ATTACKER, seconds_ago=0)
+        guild.entries.remove(attacker)
+        asyncio.get_running_loop().call_later(0.1, resolver.record, attacker)
+        self.assertEqual(await resolver.resolve(guild, GUILD_UPDATE, guild.id, since), ATTACKER)
+
+    async def test_older_push_does_not_replace_newer_entry(self):
+        guild = StubGuild()
+        resolver = ExecutorResolver(wait=0)
+        resolver.record(guild.log(ATTACKER, seconds_ago=0))
+        resolver.record(guild.log(ADMIN, seconds_ago=20))
+        self.assertEqual(await resolver.resolve(guild, GUILD_UPDATE, guild.id), ATTACKER)
+
+
+if __name__ == "__main__":
+    unittest.main()